@@ -0,0 +1,483 @@
+#!/usr/bin/env python
+"""
+Micro benchmarks for plyproto.
+
+Usage: python benchmark.py [-r REPEAT] [benchmark ...]
+Runs all benchmarks when no name is given.
+"""
+
+import os
+import sys
+import time
+import argparse
+import shutil
+import tempfile
+import subprocess
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, ROOT)
+
+SAMPLE = """package tutorial;
+option java_outer_classname = "PushNotifications";
+
+message Person {
+  required string name = 1;
+  required int32 id = 2;
+  optional string email = 3;
+
+  enum PhoneType {
+    MOBILE = 0;
+    HOME = 1;
+    WORK = 2;
+  }
+
+  message PhoneNumber {
+    required string number = 1;
+    optional PhoneType type = 2 [default = HOME];
+  }
+
+  repeated PhoneNumber phone = 4;
+  extensions 500 to 990;
+}
+"""
+
+BENCHMARKS = []
+
+def benchmark(f):
+    BENCHMARKS.append(f)
+    return f
+
+def best_of(repeat, f, *args):
+    best = None
+    for _ in range(repeat):
+        start = time.time()
+        f(*args)
+        elapsed = time.time() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+@benchmark
+def cold_start(args):
+    '''Time to first parse in a fresh interpreter, shipped tables vs. tables built at runtime.'''
+    code = ("import time; start = time.time(); import plyproto.parser as p; "
+            "p.ProtobufAnalyzer(%s).parse_string(%r); print(time.time() - start)")
+    for label, params in (('prebuilt tables', ''), ('runtime tables', 'lextab=None, tabmodule=None')):
+        samples = []
+        for _ in range(args.repeat):
+            out = subprocess.check_output([sys.executable, '-c', code % (params, SAMPLE)], cwd=ROOT)
+            samples.append(float(out.decode().strip()))
+        print('  %-20s best %.2f ms, mean %.2f ms' % (label, min(samples) * 1e3, sum(samples) / len(samples) * 1e3))
+
+@benchmark
+def analyzer_creation(args):
+    '''Cost of a new analyzer, built from scratch vs. cloned from the shared one.'''
+    import plyproto
+    import plyproto.parser
+
+    def create(factory, n):
+        for _ in range(n):
+            factory()
+
+    n = 200
+    for label, factory in (('ProtobufAnalyzer()', plyproto.parser.ProtobufAnalyzer), ('get_analyzer()', plyproto.get_analyzer)):
+        elapsed = best_of(args.repeat, create, factory, n)
+        print('  %-20s %.1f us per analyzer' % (label, elapsed / n * 1e6))
+
+@benchmark
+def body_size(args):
+    '''Parse time vs. number of message fields and enum values, should grow linearly.'''
+    import plyproto
+    analyzer = plyproto.get_analyzer()
+    for n in (2500, 5000, 10000, 20000):
+        message = 'message M {\n%s}\n' % ''.join('  optional int32 f%d = %d;\n' % (i, i + 1) for i in range(n))
+        enum = 'enum E {\n%s}\n' % ''.join('  V%d = %d;\n' % (i, i) for i in range(n))
+        tm = best_of(args.repeat, analyzer.parse_string, message)
+        te = best_of(args.repeat, analyzer.parse_string, enum)
+        print('  n=%-6d message %7.1f ms (%.2f us/field), enum %7.1f ms (%.2f us/value)'
+              % (n, tm * 1e3, tm / n * 1e6, te * 1e3, te / n * 1e6))
+
+@benchmark
+def file_input(args):
+    '''Reading 1, 10 and 100 MB files: line by line concatenation vs. bulk read vs. mmap.'''
+    from plyproto.parser import read_source
+
+    def concat(path):
+        content = ''
+        with open(path) as f:
+            for line in f:
+                content += line
+        return content
+
+    tmpdir = tempfile.mkdtemp()
+    try:
+        for mb in (1, 10, 100):
+            path = os.path.join(tmpdir, 'in%d.proto' % mb)
+            with open(path, 'w') as f:
+                for _ in range(mb * 1024 * 1024 // len(SAMPLE) + 1):
+                    f.write(SAMPLE)
+            tc = best_of(args.repeat, concat, path)
+            tb = best_of(args.repeat, read_source, path, 'utf-8', float('inf'))
+            tm = best_of(args.repeat, read_source, path, 'utf-8', 0)
+            print('  %3d MB: concat %8.1f ms, bulk read %8.1f ms, mmap %8.1f ms' % (mb, tc * 1e3, tb * 1e3, tm * 1e3))
+            os.remove(path)
+    finally:
+        os.rmdir(tmpdir)
+
+# Measures the memory retained by a tree parsed in a fresh interpreter, runs against any checkout of the package.
+TREE_MEMORY_SCRIPT = """
+import gc, sys, tracemalloc
+import plyproto.parser
+code = sys.stdin.read()
+analyzer = plyproto.parser.ProtobufAnalyzer()
+kwargs = {'lean': True} if sys.argv[1] == 'lean' else {}
+analyzer.parse_string(code, **kwargs)
+gc.collect()
+tracemalloc.start()
+base = tracemalloc.get_traced_memory()[0]
+# Fresh copy of the source, the caller drops it after parsing.
+tree = analyzer.parse_string(code + '\\n', **kwargs)
+gc.collect()
+print(tracemalloc.get_traced_memory()[0] - base)
+"""
+
+@benchmark
+def tree_memory(args):
+    '''Memory retained by a parsed tree per source byte, default vs. lean tree, vs. the --baseline checkout if given.'''
+    code = SAMPLE + SAMPLE.split('\n', 2)[2] * 200
+
+    def retained(root, mode):
+        # The checkout is run from an empty directory, older versions write parser tables to the working directory.
+        tmpdir = tempfile.mkdtemp()
+        try:
+            env = dict(os.environ, PYTHONPATH=os.path.abspath(root))
+            proc = subprocess.Popen([sys.executable, '-c', TREE_MEMORY_SCRIPT, mode], cwd=tmpdir, env=env,
+                                    stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+            out = proc.communicate(code.encode('utf-8'))[0]
+        finally:
+            shutil.rmtree(tmpdir)
+        return int(out.decode().strip().splitlines()[-1])
+
+    runs = [('default', ROOT, 'default'), ('lean', ROOT, 'lean')]
+    if args.baseline:
+        runs.insert(0, ('baseline', args.baseline, 'default'))
+    for label, root, mode in runs:
+        size = retained(root, mode)
+        print('  %-8s %9d bytes retained, %.1f bytes per source byte' % (label, size, float(size) / len(code)))
+
+@benchmark
+def node_construction(args):
+    '''Construction time and size of model nodes.'''
+    import gc
+    import tracemalloc
+    from plyproto.model import FieldDefinition, FieldType, Name
+
+    def build(n):
+        return [FieldDefinition('optional', FieldType('int32'), Name('f'), '1', []) for _ in range(n)]
+
+    n = 20000
+    elapsed = best_of(args.repeat, build, n)
+    gc.collect()
+    tracemalloc.start()
+    nodes = build(n)
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    print('  %.2f us per field definition (3 nodes), %d bytes per field definition' % (elapsed / n * 1e6, size // n))
+    del nodes
+
+@benchmark
+def lexer_throughput(args):
+    '''Lexer speed in tokens per second.'''
+    import plyproto
+    analyzer = plyproto.get_analyzer()
+    code = SAMPLE + SAMPLE.split('\n', 2)[2] * 500
+
+    def tokenize():
+        lexer = analyzer.lexer.clone()
+        lexer.input(code)
+        n = 0
+        for _ in lexer:
+            n += 1
+        return n
+
+    n = tokenize()
+    rate = n / best_of(args.repeat, tokenize)
+    print('  %d tokens, %.0f tokens/s' % (n, rate))
+    if args.min_rate and rate < args.min_rate:
+        print('  FAIL: below %.0f tokens/s' % args.min_rate)
+        sys.exit(1)
+
+@benchmark
+def token_buffer(args):
+    '''Token buffer size vs. a list of token objects, parsing from a cached buffer vs. from the source.'''
+    import gc
+    import tracemalloc
+    import plyproto
+    analyzer = plyproto.get_analyzer(lean=True)
+    code = SAMPLE + SAMPLE.split('\n', 2)[2] * 200
+
+    def retained(f):
+        gc.collect()
+        tracemalloc.start()
+        base = tracemalloc.get_traced_memory()[0]
+        obj = f()
+        size = tracemalloc.get_traced_memory()[0] - base
+        tracemalloc.stop()
+        return obj, size
+
+    def token_list():
+        lexer = analyzer.lexer.clone()
+        lexer.input(code)
+        return list(lexer)
+
+    tokens, list_size = retained(token_list)
+    buf, buf_size = retained(lambda: analyzer.tokenize_buffer(code))
+    print('  %d tokens, list %d bytes, buffer %d bytes' % (len(buf), list_size, buf_size))
+    print('  parse source %.4fs, parse buffer %.4fs' % (best_of(args.repeat, analyzer.parse_string, code),
+                                                       best_of(args.repeat, analyzer.parse_buffer, buf)))
+
+@benchmark
+def incremental_reparse(args):
+    '''Latency of a full parse vs. incremental reparse of a one character edit in the middle, by file size.'''
+    import plyproto
+    analyzer = plyproto.get_analyzer()
+    body = SAMPLE.split('\n', 2)[2]
+    for n in (10, 100, 1000):
+        code = SAMPLE + body * n
+        offset = code.index('email', len(code) // 2) + 1
+
+        def edit():
+            tree = analyzer.parse_string(code)
+            start = time.time()
+            analyzer.reparse(tree, offset, 0, 'x')
+            return time.time() - start
+
+        full = best_of(args.repeat, analyzer.parse_string, code)
+        inc = min(edit() for _ in range(args.repeat))
+        print('  %6d bytes  full %.4fs  reparse %.4fs' % (len(code), full, inc))
+
+@benchmark
+def ast_cache(args):
+    '''Parsing a file vs. loading its tree from the on-disk cache.'''
+    import shutil
+    import plyproto
+    from plyproto.cache import ASTCache
+    analyzer = plyproto.get_analyzer()
+    tmpdir = tempfile.mkdtemp()
+    try:
+        path = os.path.join(tmpdir, 'sample.proto')
+        with open(path, 'w') as fh:
+            fh.write(SAMPLE + SAMPLE.split('\n', 2)[2] * 200)
+        cache = ASTCache(os.path.join(tmpdir, 'cache'))
+        analyzer.parse_file(path, cache=cache)
+        print('  parse %.4fs, cache hit %.4fs' % (best_of(args.repeat, analyzer.parse_file, path),
+                                                  best_of(args.repeat, lambda: analyzer.parse_file(path, cache=cache))))
+        print('  %s' % cache.stats())
+    finally:
+        shutil.rmtree(tmpdir)
+
+@benchmark
+def ast_format(args):
+    '''Size of the binary AST file vs. pickle, loading the whole tree vs. a single statement.'''
+    import pickle
+    import shutil
+    import plyproto
+    from plyproto import astfile
+    analyzer = plyproto.get_analyzer()
+    tree = analyzer.parse_string(SAMPLE + SAMPLE.split('\n', 2)[2] * 200, lean=True)
+    tmpdir = tempfile.mkdtemp()
+    try:
+        path = os.path.join(tmpdir, 'sample.ast')
+        astfile.dump(tree, path)
+        print('  binary %d bytes (with source), pickle %d bytes' % (os.path.getsize(path),
+                                                                    len(pickle.dumps(tree, pickle.HIGHEST_PROTOCOL))))
+        with astfile.ASTFile.open(path) as f:
+            middle = len(f) // 2
+            print('  root() %.4fs, statement(i) %.6fs, names() %.4fs' % (
+                best_of(args.repeat, f.root), best_of(args.repeat, f.statement, middle), best_of(args.repeat, f.names)))
+        print('  load() %.4fs' % best_of(args.repeat, astfile.load, path))
+    finally:
+        shutil.rmtree(tmpdir)
+
+@benchmark
+def tree_walk(args):
+    '''Visiting a large tree - no handlers, a single handler, per-call name lookup (old dispatch).'''
+    import plyproto
+    from plyproto import model
+    tree = plyproto.get_analyzer().parse_string(SAMPLE + SAMPLE.split('\n', 2)[2] * 200, lean=True)
+
+    class Sparse(model.Visitor):
+        def __init__(self):
+            super(Sparse, self).__init__()
+            self.fields = 0
+
+        def visit_FieldDefinition(self, obj):
+            self.fields += 1
+            return True
+
+    class ByName(Sparse):
+        def visit(self, node):
+            return getattr(self, model.visit_name(node.__class__))(node)
+
+    for cls in (model.Visitor, Sparse, ByName):
+        print('  %-8s %.4fs' % (cls.__name__, best_of(args.repeat, lambda: tree.accept(cls()))))
+
+@benchmark
+def traverse(args):
+    '''Iterative accept() and traverse() vs. a recursive walk, counting the nodes of deep and wide trees.'''
+    import plyproto
+    from plyproto import model
+    analyzer = plyproto.get_analyzer()
+    # The recursive walk needs a few frames per nesting level, keep the deep tree within the recursion limit.
+    depth = sys.getrecursionlimit() // 5
+    trees = [('deep', analyzer.parse_string('message M {' * depth + 'optional int32 x = 1;' + '}' * depth, lean=True)),
+             ('wide', analyzer.parse_string(SAMPLE + SAMPLE.split('\n', 2)[2] * 200, lean=True))]
+
+    class Count(model.Visitor):
+        def __init__(self):
+            super(Count, self).__init__()
+            self.n = 0
+
+        def visit(self, node):
+            self.n += 1
+            return True
+
+    def visit(obj, visitor):
+        # accept() as it was before, one call per node and field
+        if obj is None:
+            return
+        if isinstance(obj, model.LU):
+            visit(obj.pval, visitor)
+        elif isinstance(obj, list):
+            for x in obj:
+                visit(x, visitor)
+        elif isinstance(obj, model.SourceElement) and visitor.visit(obj) and not obj._leaf:
+            for x in obj._get_children(obj):
+                visit(x, visitor)
+
+    def run(f):
+        def count(tree):
+            counter = Count()
+            f(tree, counter)
+            return counter.n
+        return count
+
+    walks = [('accept', run(lambda tree, counter: tree.accept(counter))),
+             ('traverse', run(lambda tree, counter: model.traverse(tree, counter.visit))),
+             ('recursive', run(visit))]
+    for name, tree in trees:
+        print('  %-4s %s' % (name, ', '.join('%s %.4fs (%d nodes)' % (label, best_of(args.repeat, f, tree), f(tree))
+                                            for label, f in walks)))
+    depth *= 20
+    tree = analyzer.parse_string('message M {' * depth + 'optional int32 x = 1;' + '}' * depth, lean=True)
+    print('  depth %d: %s, recursive over the recursion limit' % (
+        depth, ', '.join('%s %.4fs (%d nodes)' % (label, best_of(args.repeat, f, tree), f(tree)) for label, f in walks[:2])))
+
+@benchmark
+def child_iteration(args):
+    '''Listing all nodes of a tree - walk() over the child schema vs. probing all fields by name.'''
+    import plyproto
+    from plyproto import model
+    tree = plyproto.get_analyzer().parse_string(SAMPLE + SAMPLE.split('\n', 2)[2] * 200, lean=True)
+
+    def probe(obj, out):
+        if isinstance(obj, list):
+            for x in obj:
+                probe(x, out)
+        elif hasattr(obj, 'pval'):
+            probe(obj.pval, out)
+        elif hasattr(obj, '_fields'):
+            out.append(obj)
+            for k in obj._fields:
+                probe(getattr(obj, k), out)
+        return out
+
+    print('  walk() %.4fs (%d nodes), probing %.4fs (%d nodes)' % (
+        best_of(args.repeat, lambda: list(tree.walk())), len(list(tree.walk())),
+        best_of(args.repeat, probe, tree, []), len(probe(tree, []))))
+
+@benchmark
+def node_index(args):
+    '''Parsing with the node-kind index, collecting messages from the index vs. by a visitor pass.'''
+    import plyproto
+    from plyproto import model
+    analyzer = plyproto.get_analyzer(lean=True)
+    code = SAMPLE + SAMPLE.split('\n', 2)[2] * 200
+    plain = analyzer.parse_string(code)
+    indexed = analyzer.parse_string(code, index=True)
+
+    class Messages(model.Visitor):
+        def __init__(self):
+            super(Messages, self).__init__()
+            self.nodes = []
+
+        def visit_MessageDefinition(self, obj):
+            self.nodes.append(obj)
+            return True
+
+    def visitor_pass():
+        visitor = Messages()
+        plain.accept(visitor)
+        return visitor.nodes
+
+    print('  parse %.4fs, parse with index %.4fs' % (best_of(args.repeat, analyzer.parse_string, code),
+                                                     best_of(args.repeat, lambda: analyzer.parse_string(code, index=True))))
+    print('  %d messages: visitor pass %.6fs, nodes_of %.6fs' % (
+        len(visitor_pass()), best_of(args.repeat, visitor_pass),
+        best_of(args.repeat, indexed.nodes_of, model.MessageDefinition)))
+
+@benchmark
+def symbol_table(args):
+    '''Resolving all field types - symbol table vs. searching the enclosing message bodies by name.'''
+    import plyproto
+    from plyproto import model
+    from plyproto.symbols import SymbolTable
+    body = SAMPLE.split('\n', 2)[2]
+    code = 'package tutorial;\n' + ''.join(body.replace('Person', 'Person%d' % i) for i in range(200)) + \
+        ''.join('message Book%d { repeated Person%d person = 1; optional Person%d.PhoneNumber phone = 2; }\n'
+                % (i, i, i) for i in range(200))
+    tree = plyproto.get_analyzer(lean=True).parse_string(code)
+
+    def find(body, name):
+        for x in body:
+            if isinstance(x, (model.MessageDefinition, model.EnumDefinition)) and str(x.name.value) == name:
+                return x
+        return None
+
+    def search():
+        # Looks up the first name component from the innermost message outwards, then the rest inside it.
+        found = 0
+        stack = [(x, [tree.body]) for x in tree.body]
+        while stack:
+            node, scopes = stack.pop()
+            if isinstance(node, model.MessageDefinition):
+                stack.extend((x, scopes + [node.body]) for x in node.body)
+            elif isinstance(node, model.FieldDefinition) and isinstance(node.ftype, model.DotName):
+                parts = node.ftype.value.split('.')
+                for scope in reversed(scopes):
+                    target = find(scope, parts[0])
+                    if target is not None:
+                        for part in parts[1:]:
+                            target = find(target.body, part) if target is not None else None
+                        found += target is not None
+                        break
+        return found
+
+    table = SymbolTable(tree)
+    print('  %d references, %d resolved' % (len(table.references), len(table.references) - len(table.unresolved)))
+    print('  symbol table %.4fs, linear search %.4fs (%d resolved)' % (
+        best_of(args.repeat, SymbolTable, tree), best_of(args.repeat, search), search()))
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='plyproto benchmarks')
+    parser.add_argument('-r', '--repeat', help='Number of repetitions', default=5, type=int)
+    parser.add_argument('--baseline', help='Checkout of an older version to compare tree_memory with', default=None)
+    parser.add_argument('--min-rate', help='Fail lexer_throughput below this many tokens per second', default=0,
+                        type=float)
+    parser.add_argument('names', nargs='*', help='Benchmarks to run: %s' % ', '.join(f.__name__ for f in BENCHMARKS))
+    args = parser.parse_args()
+
+    for f in BENCHMARKS:
+        if args.names and f.__name__ not in args.names:
+            continue
+        print('%s: %s' % (f.__name__, f.__doc__))
+        f(args)
@@ -200,7 +200,11 @@ def call_errorfunc(errorfunc,token,parser):
     _token = parser.token
     _restart = parser.restart
     r = errorfunc(token)
-    del _errok, _token, _restart
+    try:
+        del _errok, _token, _restart
+    except NameError:
+        pass
+    return r
 
 #-----------------------------------------------------------------------------
 #                        ===  LR Parsing Engine ===
@@ -0,0 +1,6 @@
+import sys
+
+if sys.version_info < (3, 6):
+    raise ImportError('plyproto requires Python 3.6 or newer')
+
+from .parser import ProtobufAnalyzer, get_analyzer
@@ -0,0 +1,298 @@
+__author__ = "Dusan (Ph4r05) Klinec"
+__copyright__ = "Copyright (C) 2014 Dusan (ph4r05) Klinec"
+__license__ = "Apache License, Version 2.0"
+__version__ = "1.0"
+
+# Binary format of parse trees, readable in place (e.g., from mmap) without loading the whole tree.
+#
+# Layout, all integers little-endian:
+#   header    magic, format version, item/child/string counts, root item, source string, first line
+#   items     fixed size records (kind, start, end, a, b, parent) of nodes, LUs and lists,
+#             the item's children are children[a:a + b] (node fields in _fields order, LU value, list elements)
+#   children  references - an item index, STRING | string index, or NONE for None
+#   strings   end offsets of the strings followed by the UTF-8 data
+# Missing spans and parents are stored as NONE.
+
+import os
+import mmap
+import struct
+from . import model
+from .lineindex import LineIndex
+
+MAGIC = b'PLYAST'
+FORMAT_VERSION = 1
+NONE = 0xFFFFFFFF
+STRING = 0x80000000
+
+HEADER = struct.Struct('<6sHIIIIII')
+RECORD = struct.Struct('<BxxxIIIII')
+INDEX = struct.Struct('<I')
+
+# Item kind codes, the position in this tuple. Append only, otherwise bump FORMAT_VERSION.
+KIND_LIST, KIND_LU = 0, 1
+NODE_KINDS = (None, None,
+              model.ProtoFile, model.PackageStatement, model.ImportStatement, model.OptionStatement,
+              model.FieldDirective, model.FieldType, model.FieldDefinition, model.EnumFieldDefinition,
+              model.EnumDefinition, model.MessageDefinition, model.MessageExtension, model.MethodDefinition,
+              model.ServiceDefinition, model.ExtensionsMax, model.ExtensionsDirective, model.Literal,
+              model.Name, model.DotName)
+KIND_CODES = dict((cls, code) for code, cls in enumerate(NODE_KINDS) if cls is not None)
+
+def _children(obj, kind):
+    if kind == KIND_LIST:
+        return obj
+    if kind == KIND_LU:
+        return (obj.pval,)
+    return [getattr(obj, k) for k in obj._fields]
+
+def dumps(tree, source=True):
+    '''
+    Serializes the tree to bytes, together with its source (needed for line numbers) if source is set.
+    '''
+    items = []      # (value, kind) in pre-order
+    index = {}      # id(value) -> item index
+    strings = []
+    string_index = {}
+
+    def string(s):
+        idx = string_index.get(s)
+        if idx is None:
+            idx = string_index[s] = len(strings)
+            strings.append(s)
+        return idx
+
+    stack = [tree]
+    while stack:
+        obj = stack.pop()
+        if obj is None or isinstance(obj, str) or id(obj) in index:
+            continue
+        if isinstance(obj, list):
+            kind = KIND_LIST
+        elif isinstance(obj, model.LU):
+            kind = KIND_LU
+        else:
+            kind = KIND_CODES[type(obj)]
+        index[id(obj)] = len(items)
+        items.append((obj, kind))
+        stack.extend(reversed(_children(obj, kind)))
+
+    records = []
+    children = []
+    for obj, kind in items:
+        start = end = NONE
+        span = getattr(obj, 'lexspan', None)
+        if span is not None:
+            start, end = span
+        parent = index.get(id(getattr(obj, 'parent', None)), NONE)
+        kids = _children(obj, kind)
+        records.append((kind, start, end, len(children), len(kids), parent))
+        for x in kids:
+            if x is None:
+                children.append(NONE)
+            elif isinstance(x, str):
+                children.append(STRING | string(x))
+            else:
+                children.append(index[id(x)])
+
+    src = NONE
+    lines = getattr(tree, 'lines', None)
+    first_line = lines.first_line if lines is not None else 1
+    if source and lines is not None and lines.source is not None:
+        src = string(lines.source)
+
+    encoded = [x.encode('utf-8', 'surrogatepass') for x in strings]
+    offsets = []
+    total = 0
+    for e in encoded:
+        total += len(e)
+        offsets.append(total)
+
+    out = [HEADER.pack(MAGIC, FORMAT_VERSION, len(records), len(children), len(strings), 0, src, first_line)]
+    out.extend(RECORD.pack(*r) for r in records)
+    out.append(struct.pack('<%dI' % len(children), *children))
+    out.append(struct.pack('<%dI' % len(offsets), *offsets))
+    out.extend(encoded)
+    return b''.join(out)
+
+def dump(tree, path, source=True):
+    '''
+    Writes the tree to a file, atomically replacing it.
+    '''
+    tmp = '%s.tmp%d' % (path, os.getpid())
+    with open(tmp, 'wb') as fh:
+        fh.write(dumps(tree, source))
+    os.replace(tmp, path)
+
+class ASTFile(object):
+    '''
+    Serialized tree read in place from bytes or a mmap. Nodes are created only for the parts asked for,
+    e.g., a single top level statement by statement(i).
+    '''
+    def __init__(self, data):
+        self.data = data
+        magic, version, self.n_items, self.n_children, self.n_strings, self.root_index, self.source_index, \
+            self.first_line = HEADER.unpack_from(data, 0)
+        if magic != MAGIC:
+            raise ValueError('Not a plyproto AST file')
+        if version != FORMAT_VERSION:
+            raise ValueError('Unsupported AST file version %d' % version)
+        self.items_off = HEADER.size
+        self.children_off = self.items_off + self.n_items * RECORD.size
+        self.strings_off = self.children_off + self.n_children * INDEX.size
+        self.blob_off = self.strings_off + self.n_strings * INDEX.size
+        self._strings = {}
+        self._lines = None
+        self._mmap = None
+        self._fh = None
+
+    @classmethod
+    def open(cls, path):
+        '''
+        Maps the file to memory, close() the returned object when done.
+        '''
+        fh = open(path, 'rb')
+        try:
+            mm = mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ)
+        except Exception:
+            fh.close()
+            raise
+        res = cls(mm)
+        res._fh, res._mmap = fh, mm
+        return res
+
+    def close(self):
+        if self._mmap is not None:
+            self._mmap.close()
+            self._fh.close()
+            self._mmap = self._fh = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def record(self, idx):
+        return RECORD.unpack_from(self.data, self.items_off + idx * RECORD.size)
+
+    def child(self, rec, i):
+        return INDEX.unpack_from(self.data, self.children_off + (rec[3] + i) * INDEX.size)[0]
+
+    def string(self, idx):
+        s = self._strings.get(idx)
+        if s is None:
+            start = INDEX.unpack_from(self.data, self.strings_off + (idx - 1) * INDEX.size)[0] if idx else 0
+            end = INDEX.unpack_from(self.data, self.strings_off + idx * INDEX.size)[0]
+            s = self._strings[idx] = bytes(self.data[self.blob_off + start:self.blob_off + end]).decode('utf-8', 'surrogatepass')
+        return s
+
+    @property
+    def lines(self):
+        if self._lines is None and self.source_index != NONE:
+            self._lines = LineIndex(self.string(self.source_index), self.first_line)
+        return self._lines
+
+    def _body(self):
+        root = self.record(self.root_index)
+        return self.record(self.child(root, NODE_KINDS[root[0]]._fields.index('body')))
+
+    def __len__(self):
+        '''
+        Number of the top level statements.
+        '''
+        return self._body()[4]
+
+    def names(self):
+        '''
+        Returns (kind, name) of the top level statements, only the names are read.
+        '''
+        body = self._body()
+        res = []
+        for i in range(body[4]):
+            rec = self.record(self.child(body, i))
+            cls = NODE_KINDS[rec[0]]
+            name = None
+            if 'name' in cls._fields:
+                name = self._str_value(self.child(rec, cls._fields.index('name')))
+            res.append((cls.__name__, name))
+        return res
+
+    def _str_value(self, ref):
+        # Text of a Name/LU/Literal chain, None for other items
+        kinds = (KIND_LU, KIND_CODES[model.Name], KIND_CODES[model.DotName], KIND_CODES[model.Literal])
+        while ref != NONE and not ref & STRING:
+            rec = self.record(ref)
+            if rec[0] not in kinds:
+                return None
+            ref = self.child(rec, 0)
+        return None if ref == NONE else self.string(ref & ~STRING)
+
+    def statement(self, i):
+        '''
+        Loads the i-th top level statement, its parent is not set. Map its spans to lines by the lines property.
+        '''
+        return self.load(self.child(self._body(), i))
+
+    def root(self):
+        '''
+        Loads the whole tree.
+        '''
+        return self.load(self.root_index)
+
+    def load(self, idx):
+        '''
+        Loads the item at idx with everything below it. Like dumps, it works with an explicit stack,
+        so the depth of the tree is not limited: nodes and lists are created first, their fields are set
+        once all of them exist.
+        '''
+        objs = {NONE: None}
+        created = []
+        lines, data, string, record = self.lines, self.data, self.string, self.record
+        children_off = self.children_off
+        LU, ProtoFile = model.LU, model.ProtoFile
+        stack = [idx]
+        while stack:
+            ref = stack.pop()
+            if ref & STRING or ref in objs:
+                continue
+            rec = record(ref)
+            refs = struct.unpack_from('<%dI' % rec[4], data, children_off + rec[3] * INDEX.size)
+            kind = rec[0]
+            if kind == KIND_LIST:
+                obj = []
+            else:
+                # Node or LU without its children.
+                cls = LU if kind == KIND_LU else NODE_KINDS[kind]
+                obj = cls.__new__(cls)
+                obj.parent = None
+                obj._lexspan = None if rec[1] == NONE else (rec[1], rec[2])
+                obj._origin = None
+                obj.p = None
+                if kind == KIND_LU:
+                    obj.idx = None
+                elif cls is ProtoFile:
+                    obj.lines = lines
+                    obj.trivia = obj.diagnostics = obj.index = obj.symtab = None
+            objs[ref] = obj
+            created.append((obj, kind, rec[5], refs))
+            stack.extend(refs)
+
+        for obj, kind, parent, refs in created:
+            kids = [string(ref & ~STRING) if ref != NONE and ref & STRING else objs[ref] for ref in refs]
+            if kind == KIND_LIST:
+                obj.extend(kids)
+                continue
+            if kind == KIND_LU:
+                obj.pval = kids[0]
+            else:
+                for k, v in zip(obj._fields, kids):
+                    setattr(obj, k, v)
+            obj.parent = objs.get(parent)
+        return string(idx & ~STRING) if idx != NONE and idx & STRING else objs[idx]
+
+def load(path):
+    '''
+    Reads the whole tree from a file.
+    '''
+    with ASTFile.open(path) as f:
+        return f.root()
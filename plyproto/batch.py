@@ -0,0 +1,151 @@
+__author__ = "Dusan (Ph4r05) Klinec"
+__copyright__ = "Copyright (C) 2014 Dusan (ph4r05) Klinec"
+__license__ = "Apache License, Version 2.0"
+__version__ = "1.0"
+
+import os
+import sys
+import argparse
+import traceback
+import multiprocessing
+from collections import namedtuple
+from .parser import ProtobufAnalyzer, get_analyzer
+from .cache import ASTCache
+
+# Result of parsing a single file, error is None on success.
+# Tree is the partial AST if there were errors, diagnostics lists them as 'line:column: message'.
+ParseResult = namedtuple('ParseResult', ['path', 'tree', 'error', 'diagnostics'])
+
+# Files are grouped into chunks of roughly this many bytes so small files do not pay the IPC overhead one by one.
+CHUNK_BYTES = 256 * 1024
+
+_worker_analyzer = None
+_worker_cache = None
+
+def _init_worker(cache_dir=None, analyzer_cls=ProtobufAnalyzer):
+    global _worker_analyzer, _worker_cache
+    # Workers parse with the class of the analyzer parse_many was called with, lean trees can be pickled.
+    _worker_analyzer = get_analyzer(lean=True) if analyzer_cls is ProtobufAnalyzer else analyzer_cls(lean=True)
+    _worker_cache = ASTCache(cache_dir) if cache_dir else None
+
+def parse_path(analyzer, path, cache=None):
+    '''
+    Parses a single file, errors are reported in the result instead of being raised.
+    With an ASTCache given, unchanged files are not parsed again.
+    '''
+    try:
+        tree = analyzer.parse_file(path, cache=cache) if cache is not None else None
+        if tree is not None:
+            diagnostics = tree.diagnostics
+        else:
+            tree, diagnostics = analyzer.check_file(path, lean=True)
+        messages = diagnostics.formatted()
+        if messages:
+            return ParseResult(path, tree, '{} error(s)'.format(len(diagnostics) + diagnostics.dropped), messages)
+        if tree is None:
+            return ParseResult(path, None, 'syntax error', [])
+        return ParseResult(path, tree, None, [])
+    except Exception as e:
+        return ParseResult(path, None, '{}: {}'.format(type(e).__name__, e), [])
+
+def _parse_chunk(paths):
+    if _worker_analyzer is None:
+        _init_worker()
+    return [parse_path(_worker_analyzer, path, _worker_cache) for path in paths]
+
+def chunk_paths(paths, chunk_bytes=CHUNK_BYTES):
+    '''
+    Groups paths into chunks of approximately chunk_bytes total size, preserving the order.
+    '''
+    chunk, size = [], 0
+    for path in paths:
+        try:
+            fsize = os.path.getsize(path)
+        except OSError:
+            fsize = 0
+        if chunk and size + fsize > chunk_bytes:
+            yield chunk
+            chunk, size = [], 0
+        chunk.append(path)
+        size += fsize
+    if chunk:
+        yield chunk
+
+def find_proto_files(roots, suffix='.proto'):
+    '''
+    Yields files from the given paths, directories are searched recursively for the suffix.
+    '''
+    for root in roots:
+        if not os.path.isdir(root):
+            yield root
+            continue
+        for dirpath, dirnames, filenames in os.walk(root):
+            dirnames.sort()
+            for name in sorted(filenames):
+                if name.endswith(suffix):
+                    yield os.path.join(dirpath, name)
+
+def parse_many(paths, workers=None, ordered=True, chunk_bytes=CHUNK_BYTES, analyzer=None, cache_dir=None):
+    '''
+    Parses files in a pool of worker processes with pre-warmed parser tables.
+    Yields ParseResult per file as results arrive, in the input order if ordered, otherwise as completed.
+    A failure of one file is reported in its result and does not stop the batch.
+    With a single worker the files are parsed in this process, by the given analyzer if any.
+    Worker processes parse by a new analyzer of the given analyzer's class.
+    With cache_dir set, trees of unchanged files are taken from the ASTCache in that directory.
+    '''
+    chunks = chunk_paths(paths, chunk_bytes)
+    if workers is None:
+        workers = multiprocessing.cpu_count()
+    if workers <= 1:
+        analyzer = analyzer if analyzer is not None else get_analyzer()
+        cache = ASTCache(cache_dir) if cache_dir else None
+        for chunk in chunks:
+            for path in chunk:
+                yield parse_path(analyzer, path, cache)
+        return
+
+    analyzer_cls = type(analyzer) if analyzer is not None else ProtobufAnalyzer
+    pool = multiprocessing.Pool(workers, initializer=_init_worker, initargs=(cache_dir, analyzer_cls))
+    try:
+        results = pool.imap(_parse_chunk, chunks) if ordered else pool.imap_unordered(_parse_chunk, chunks)
+        for chunk_results in results:
+            for res in chunk_results:
+                yield res
+        pool.close()
+    finally:
+        pool.terminate()
+        pool.join()
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Parses Protocol Buffers files in parallel, reports errors per file.')
+    parser.add_argument('-j', '--workers', help='Number of worker processes', required=False, default=None, type=int)
+    parser.add_argument('-u', '--unordered', help='Report results as they complete', required=False, default=False,
+                        action='store_true')
+    parser.add_argument('-q', '--quiet', help='Report only failed files', required=False, default=False,
+                        action='store_true')
+    parser.add_argument('--cache', help='Directory of the parse tree cache', required=False, default=None)
+    parser.add_argument('paths', nargs='+', help='Files or directories with .proto files')
+    args = parser.parse_args(argv)
+
+    total, failed = 0, 0
+    try:
+        for res in parse_many(find_proto_files(args.paths), workers=args.workers, ordered=not args.unordered,
+                              cache_dir=args.cache):
+            total += 1
+            if res.error is not None:
+                failed += 1
+                print('FAIL %s: %s' % (res.path, res.error))
+                for msg in res.diagnostics:
+                    print('  %s:%s' % (res.path, msg))
+            elif not args.quiet:
+                print('OK   %s' % res.path)
+    except Exception:
+        traceback.print_exc(file=sys.stderr)
+        return 2
+
+    print('Parsed %d files, %d failed' % (total, failed))
+    return 1 if failed else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,160 @@
+__author__ = "Dusan (Ph4r05) Klinec"
+__copyright__ = "Copyright (C) 2014 Dusan (ph4r05) Klinec"
+__license__ = "Apache License, Version 2.0"
+__version__ = "1.0"
+
+import os
+import errno
+import pickle
+import hashlib
+import tempfile
+from .parser import parser_signature
+
+# Bump when the pickled tree layout changes without a change of the grammar.
+CACHE_VERSION = 1
+
+# Default cap on the total size of the cache directory.
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+
+SUFFIX = '.ast'
+
+class ASTCache(object):
+    '''
+    On-disk cache of lean parse trees, content addressed - the key is a hash of the source together
+    with the parser signature and parse options, so a stale entry is never returned.
+    Entries are written atomically (temporary file + rename) and may be shared by concurrent processes.
+    Once the directory grows over max_bytes the least recently used entries are removed, a hit refreshes
+    the entry's modification time. Counters hits, misses, writes and evictions are kept per instance.
+    '''
+    def __init__(self, directory, max_bytes=DEFAULT_MAX_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.writes = 0
+        self.evictions = 0
+        self._size = None
+        if not os.path.isdir(directory):
+            try:
+                os.makedirs(directory)
+            except OSError as e:
+                if e.errno != errno.EEXIST:
+                    raise
+
+    def stats(self):
+        return {'hits': self.hits, 'misses': self.misses, 'writes': self.writes, 'evictions': self.evictions}
+
+    def key(self, code, trivia=False, max_diagnostics=None, index=False):
+        h = hashlib.sha256()
+        h.update(('%s:%d:%d:%d:%s:%d\n' % (parser_signature(), CACHE_VERSION, pickle.HIGHEST_PROTOCOL, trivia, max_diagnostics,
+                                           index)).encode('ascii'))
+        h.update(code.encode('utf-8', 'surrogatepass'))
+        return h.hexdigest()
+
+    def path(self, key):
+        return os.path.join(self.directory, key[:2], key + SUFFIX)
+
+    def get(self, key):
+        '''
+        Returns the cached tree or None, a damaged entry is removed.
+        '''
+        path = self.path(key)
+        try:
+            with open(path, 'rb') as fh:
+                tree = pickle.load(fh)
+        except (IOError, OSError):
+            self.misses += 1
+            return None
+        except Exception:
+            self._remove(path)
+            self.misses += 1
+            return None
+        try:
+            os.utime(path, None)
+        except OSError:
+            pass
+        self.hits += 1
+        return tree
+
+    def put(self, key, tree):
+        path = self.path(key)
+        dirname = os.path.dirname(path)
+        if not os.path.isdir(dirname):
+            try:
+                os.makedirs(dirname)
+            except OSError as e:
+                if e.errno != errno.EEXIST:
+                    raise
+        fd, tmp = tempfile.mkstemp(prefix='.tmp-', dir=dirname)
+        try:
+            with os.fdopen(fd, 'wb') as fh:
+                pickle.dump(tree, fh, pickle.HIGHEST_PROTOCOL)
+                size = fh.tell()
+            os.replace(tmp, path)
+        except Exception:
+            self._remove(tmp)
+            raise
+        self.writes += 1
+        if self._size is None:
+            self._size = self._disk_size()
+        else:
+            self._size += size
+        if self._size > self.max_bytes:
+            self.evict()
+
+    def parse_string(self, analyzer, code, debug=0, trivia=False, max_diagnostics=None, index=False):
+        '''
+        Returns the lean tree of code from the cache, parses and stores it on a miss.
+        '''
+        key = self.key(code, trivia, max_diagnostics, index)
+        tree = self.get(key)
+        if tree is None:
+            tree = analyzer.parse_string(code, debug=debug, lean=True, trivia=trivia, max_diagnostics=max_diagnostics,
+                                         index=index)
+            if tree is not None:
+                self.put(key, tree)
+        elif tree.lines is not None:
+            # Only the line starts are stored, the source is the code looked up.
+            tree.lines.source = code
+        return tree
+
+    def _entries(self):
+        for dirpath, dirnames, filenames in os.walk(self.directory):
+            for name in filenames:
+                if not name.endswith(SUFFIX):
+                    continue
+                path = os.path.join(dirpath, name)
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    continue
+                yield st.st_mtime, st.st_size, path
+
+    def _disk_size(self):
+        return sum(size for _, size, _ in self._entries())
+
+    def evict(self, target=None):
+        '''
+        Removes the least recently used entries until the cache is below target bytes (90% of max_bytes).
+        '''
+        target = int(self.max_bytes * 0.9) if target is None else target
+        entries = sorted(self._entries())
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in entries:
+            if total <= target:
+                break
+            if self._remove(path):
+                self.evictions += 1
+            total -= size
+        self._size = total
+
+    def clear(self):
+        self.evict(0)
+
+    @staticmethod
+    def _remove(path):
+        try:
+            os.remove(path)
+            return True
+        except OSError:
+            return False
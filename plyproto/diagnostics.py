@@ -0,0 +1,53 @@
+__author__ = "Dusan (Ph4r05) Klinec"
+__copyright__ = "Copyright (C) 2014 Dusan (ph4r05) Klinec"
+__license__ = "Apache License, Version 2.0"
+__version__ = "1.0"
+
+from collections import namedtuple
+
+# Problem found in a source - kind is 'lex' or 'syntax', start and end are offsets into the source.
+Diagnostic = namedtuple('Diagnostic', ['kind', 'message', 'start', 'end'])
+
+# Default cap on the diagnostics recorded per source.
+MAX_DIAGNOSTICS = 100
+
+class Diagnostics(list):
+    '''
+    Diagnostics of one parse run, in source order. At most limit diagnostics are kept,
+    the rest are only counted in dropped. Lines are resolved by the line index of the source.
+    '''
+    def __init__(self, limit=MAX_DIAGNOSTICS, lines=None):
+        super(Diagnostics, self).__init__()
+        self.limit = limit
+        self.lines = lines
+        self.dropped = 0
+
+    def add(self, kind, message, start, end):
+        if self.limit is not None and len(self) >= self.limit:
+            self.dropped += 1
+            return
+        self.append(Diagnostic(kind, message, start, end))
+
+    def add_illegal(self, start, char):
+        '''
+        Records an illegal character, a run of them is merged into a single diagnostic.
+        '''
+        if self and self[-1].kind == 'lex' and self[-1].end == start:
+            self[-1] = self[-1]._replace(end=start + 1)
+            return
+        self.add('lex', "Illegal character '{}' ({})".format(char, hex(ord(char))), start, start + 1)
+
+    def format(self, diag):
+        if self.lines is None:
+            return '{}: {}'.format(diag.start, diag.message)
+        line, column = self.lines.position(diag.start)
+        return '{}:{}: {}'.format(line, column, diag.message)
+
+    def formatted(self):
+        '''
+        Returns the diagnostics as 'line:column: message' strings, including a note about dropped ones.
+        '''
+        res = [self.format(d) for d in self]
+        if self.dropped:
+            res.append('{} more diagnostics not shown'.format(self.dropped))
+        return res
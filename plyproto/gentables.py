@@ -0,0 +1,10 @@
+"""
+Regenerates the lexer and parser tables shipped with the package.
+Usage: python -m plyproto.gentables [outputdir]
+"""
+
+import sys
+from .parser import write_tables, TABLE_DIR
+
+if __name__ == '__main__':
+    write_tables(sys.argv[1] if len(sys.argv) > 1 else TABLE_DIR)
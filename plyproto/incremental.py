@@ -0,0 +1,103 @@
+__author__ = "Dusan (Ph4r05) Klinec"
+__copyright__ = "Copyright (C) 2014 Dusan (ph4r05) Klinec"
+__license__ = "Apache License, Version 2.0"
+__version__ = "1.0"
+
+from .model import shift_spans
+
+def _first(items, pred):
+    '''
+    Index of the first of items (statements, or nodes sorted by start) satisfying pred, which is monotonic over them.
+    '''
+    lo, hi = 0, len(items)
+    while lo < hi:
+        mid = (lo + hi) // 2
+        if pred(items[mid]):
+            hi = mid
+        else:
+            lo = mid + 1
+    return lo
+
+def _region_tokens(lexer, code, start, body, first, delta, sync):
+    '''
+    Lexes code from start until the first token starting exactly where one of the statements
+    body[first:] now starts (old start moved by delta). Tokens from there on are the same as before
+    the edit, the index of that statement is stored to sync[0] (len(body) if lexed to the end).
+    '''
+    lexer.input(code)
+    lexer.skip(start)
+    k, n = first, len(body)
+    for tok in iter(lexer.token, None):
+        while k < n and body[k].lexspan[0] + delta < tok.lexpos:
+            k += 1
+        if k < n and body[k].lexspan[0] + delta == tok.lexpos:
+            sync[0] = k
+            return
+        yield tok
+    sync[0] = n
+
+def reparse(analyzer, tree, offset, removed, inserted, debug=0, lean=None):
+    '''
+    Updates tree after an edit of its source - removed characters at offset replaced by inserted text.
+    Only the top level statements touched by the edit are lexed and parsed again, from the end of the
+    previous statement up to the first following statement the token stream synchronizes on.
+    The new statements are spliced into tree.body, spans of the statements after them are moved, each by a single
+    update of its span origin.
+    The whole file is parsed again if the edit touches the package statement, or if the file or the
+    reparsed region has errors. Returns the updated tree, which is a new object in that case.
+    Parser objects (p) kept by the moved nodes of a non-lean tree still refer to the old positions.
+    '''
+    lines = tree.lines
+    if lines is None or lines.source is None:
+        raise ValueError('Tree has no source to apply the edit to')
+    old = lines.source
+    if offset < 0 or removed < 0 or offset + removed > len(old):
+        raise ValueError('Edit out of the source range')
+    code = old[:offset] + inserted + old[offset + removed:]
+    delta = len(inserted) - removed
+    end = offset + removed
+    trivia = tree.trivia is not None
+    index = tree.index is not None
+
+    def full():
+        return analyzer.parse_string(code, debug=debug, lineno=lines.first_line, lean=lean, trivia=trivia, index=index)
+
+    pkg, body = tree.pkg, tree.body
+    head = pkg.lexspan[1] if pkg else 0
+    if tree.diagnostics or (pkg and offset <= head):
+        return full()
+
+    # Statements touching the edit are body[i:j], the region starts at the end of the previous one.
+    i = _first(body, lambda s: s.lexspan[1] >= offset)
+    j = _first(body, lambda s: s.lexspan[0] > end)
+    start = body[i - 1].lexspan[1] if i > 0 else head
+
+    ctx = analyzer.context(lineno=lines.first_line, lean=lean, trivia=trivia, index=index)
+    sync = [None]
+    tokens = _region_tokens(ctx.lexer, code, start, body, j, delta, sync)
+    sub = ctx.parse_tokens(tokens, lines, debug)
+    if sub is None or sub.diagnostics or sub.pkg:
+        return full()
+
+    k = sync[0]
+    region_end = body[k].lexspan[0] if k < len(body) else len(old)
+    if index:
+        # Indexed nodes of the replaced statements lie in the region, the following ones are moved below.
+        for cls, nodes in tree.index.items():
+            lo = _first(nodes, lambda n: n.lexspan[0] >= start)
+            hi = _first(nodes, lambda n: n.lexspan[0] >= region_end)
+            nodes[lo:hi] = sub.index[cls]
+    for stmt in body[k:]:
+        shift_spans(stmt, delta)
+    for stmt in sub.body:
+        stmt.parent = tree
+    body[i:k] = sub.body
+    if trivia:
+        tree.trivia.splice(start, region_end, delta, sub.trivia)
+
+    # Nodes share the line index, it is rebuilt on the next line query. Symbols are resolved again on demand.
+    lines.reset(code)
+    tree.symtab = None
+    first = pkg if pkg else (body[0] if body else None)
+    tree.lexspan = (first.lexspan[0], (body[-1] if body else first).lexspan[1]) if first is not None else None
+    return tree
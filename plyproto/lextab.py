@@ -0,0 +1,10 @@
+# plyproto.lextab.py. This file automatically created by PLY (version 3.5). Don't edit!
+_tabversion   = '3.5'
+_lextokens    = {'NAME': 1, 'NUM': 1, 'STRING_LITERAL': 1, 'LINE_COMMENT': 1, 'BLOCK_COMMENT': 1, 'LBRACE': 1, 'RBRACE': 1, 'LBRACK': 1, 'RBRACK': 1, 'LPAR': 1, 'RPAR': 1, 'EQ': 1, 'SEMI': 1, 'DOT': 1, 'STARTTOKEN': 1, 'DOUBLE': 1, 'FLOAT': 1, 'INT32': 1, 'INT64': 1, 'UINT32': 1, 'UINT64': 1, 'SINT32': 1, 'SINT64': 1, 'FIXED32': 1, 'FIXED64': 1, 'SFIXED32': 1, 'SFIXED64': 1, 'BOOL': 1, 'STRING': 1, 'BYTES': 1, 'MESSAGE': 1, 'REQUIRED': 1, 'OPTIONAL': 1, 'REPEATED': 1, 'ENUM': 1, 'EXTENSIONS': 1, 'MAX': 1, 'EXTENDS': 1, 'EXTEND': 1, 'TO': 1, 'PACKAGE': 1, 'SERVICE': 1, 'RPC': 1, 'RETURNS': 1, 'TRUE': 1, 'FALSE': 1, 'OPTION': 1, 'IMPORT': 1}
+_lexreflags   = 0
+_lexliterals  = '()+-*/=?:,.^|&~!=[]{};<>@%'
+_lexstateinfo = {'INITIAL': 'inclusive'}
+_lexstatere   = {'INITIAL': [('(?P<t_LINE_COMMENT>//.*)|(?P<t_BLOCK_COMMENT>/\\*(.|\\n)*?\\*/)|(?P<t_NAME>[A-Za-z_$][A-Za-z0-9_$]*)|(?P<t_STRING_LITERAL>\\"([^\\\\\\n]|(\\\\.))*?\\")|(?P<t_NUM>[+-]?\\d+)|(?P<t_ignore_newline>(\\r?\\n)+)|(?P<t_DOT>\\.)|(?P<t_LBRACK>\\[)|(?P<t_LPAR>\\()|(?P<t_RBRACK>\\])|(?P<t_RPAR>\\))|(?P<t_EQ>=)|(?P<t_LBRACE>{)|(?P<t_RBRACE>})|(?P<t_SEMI>;)', [None, ('t_LINE_COMMENT', 'LINE_COMMENT'), ('t_BLOCK_COMMENT', 'BLOCK_COMMENT'), None, ('t_NAME', 'NAME'), (None, 'STRING_LITERAL'), None, None, (None, 'NUM'), (None, None), None, (None, 'DOT'), (None, 'LBRACK'), (None, 'LPAR'), (None, 'RBRACK'), (None, 'RPAR'), (None, 'EQ'), (None, 'LBRACE'), (None, 'RBRACE'), (None, 'SEMI')])]}
+_lexstateignore = {'INITIAL': ' \t\x0c'}
+_lexstateerrorf = {'INITIAL': 't_error'}
+_signature = '3da92545b3d9783e5049a21054e4a9c2'
@@ -0,0 +1,74 @@
+__author__ = "Dusan (Ph4r05) Klinec"
+__copyright__ = "Copyright (C) 2014 Dusan (ph4r05) Klinec"
+__license__ = "Apache License, Version 2.0"
+__version__ = "1.0"
+
+import bisect
+import itertools
+from array import array
+
+class LineIndex(object):
+    '''
+    Maps offsets into a source to lines and columns. Offsets of the line starts are computed
+    on the first query, in one pass over the source, lookups are then bisections.
+    Lines and columns are 1-based, first_line is the number of the first source line.
+    A pickled index keeps only the line starts, source is None when it is loaded.
+    '''
+    __slots__ = ('source', 'first_line', '_starts')
+
+    def __init__(self, source, first_line=1):
+        self.source = source
+        self.first_line = first_line
+        self._starts = None
+
+    def reset(self, source):
+        '''
+        Switches the index to a new version of the source, line starts are computed again on the next query.
+        '''
+        self.source = source
+        self._starts = None
+
+    @property
+    def starts(self):
+        '''
+        Offsets of the line starts.
+        '''
+        if self._starts is None:
+            # Each line starts one past the end of the previous one (its newline).
+            lengths = map(len, self.source.split('\n')[:-1])
+            self._starts = array('I', itertools.chain((0,), itertools.accumulate(map((1).__add__, lengths))))
+        return self._starts
+
+    def __getstate__(self):
+        # The source is not pickled, only the line starts, e.g., for trees sent from worker processes or cached.
+        return self.first_line, self.starts
+
+    def __setstate__(self, state):
+        self.first_line, self._starts = state
+        self.source = None
+
+    def __len__(self):
+        return len(self.starts)
+
+    def line(self, offset):
+        return bisect.bisect_right(self.starts, offset) - 1 + self.first_line
+
+    def column(self, offset):
+        return self.position(offset)[1]
+
+    def position(self, offset):
+        '''
+        Returns (line, column) of the offset.
+        '''
+        starts = self.starts
+        idx = bisect.bisect_right(starts, offset) - 1
+        return idx + self.first_line, offset - starts[idx] + 1
+
+    def linespan(self, lexspan):
+        '''
+        Returns (first, last) line of a half-open lexspan, None for no span.
+        '''
+        if lexspan is None:
+            return None
+        start, end = lexspan
+        return self.line(start), self.line(max(start, end - 1))
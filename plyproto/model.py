@@ -3,7 +3,25 @@ __copyright__ = "Copyright (C) 2014 Dusan (ph4r05) Klinec"
 __license__ = "Apache License, Version 2.0"
 __version__ = "1.0"
 
+import sys
+import operator
+
+def visit_name(node_cls):
+    '''
+    Name of the Visitor method handling nodes of the class.
+    '''
+    return node_cls._visit_name or 'visit_' + node_cls.__name__
+
 class Visitor(object):
+    '''
+    Base of the tree visitors. node.accept(visitor) calls visitor.visit(node), which dispatches to
+    the visit_<node class name> method (visit_Proto for ProtoFile), children are visited if it returns True.
+    Handlers are looked up once per Visitor subclass and node type, the table is cached on the class.
+    Node types without a method on the class are looked up on the instance each time, or through __getattr__
+    if a subclass overrides it. Otherwise they are skipped without any call, their children are visited.
+    '''
+    # Dispatch table of the class, set on the first visit.
+    _handlers = None
 
     def __init__(self, verbose=False):
         self.verbose = verbose
@@ -19,6 +37,39 @@ class Visitor(object):
             return True
         return f
 
+    def visit(self, node):
+        try:
+            handler = self._handlers[node.__class__]
+        except (KeyError, TypeError):
+            handler = self._resolve(node.__class__)
+        if handler is None:
+            return self._visit_instance(node)
+        return handler(self, node)
+
+    def _visit_instance(self, node):
+        # Not cached, the handler may be set on the instance or supplied by __getattr__ of a subclass.
+        name = visit_name(node.__class__)
+        if type(self).__getattr__ is not Visitor.__getattr__:
+            handler = getattr(self, name, None)
+        else:
+            handler = self.__dict__.get(name)
+        if handler is None:
+            if self.verbose:
+                print('unimplemented call to {}; ignoring ({})'.format(name, node))
+            return True
+        return handler(node)
+
+    def _resolve(self, node_cls):
+        cls = self.__class__
+        table = cls.__dict__.get('_dispatch_table')
+        if table is None:
+            table = {}
+            cls._dispatch_table = table
+        self._handlers = table
+        if node_cls not in table:
+            table[node_cls] = getattr(cls, visit_name(node_cls), None)
+        return table[node_cls]
+
     # visitor.visit_PackageStatement(self)
     # visitor.visit_ImportStatement(self)
     # visitor.visit_OptionStatement(self)
@@ -37,21 +88,64 @@ class Visitor(object):
     # visitor.visit_Proto(self)
     # visitor.visit_LU(self)
 
+class SpanOrigin(object):
+    '''
+    Offset shared by all nodes of one top level statement, added to the spans they store. Moving the statement
+    after an edit of the source before it is a single update of delta instead of one per node.
+    '''
+    __slots__ = ('delta',)
+
+    def __init__(self):
+        self.delta = 0
+
 class Base(object):
-    parent = None
-    lexspan = None
-    linespan = None
+    __slots__ = ('parent', '_lexspan', '_origin')
+
+    def __init__(self):
+        self.parent = None
+        self._lexspan = None
+        self._origin = None
+
+    @property
+    def lexspan(self):
+        span = self._lexspan
+        origin = self._origin
+        if origin is None or span is None or not origin.delta:
+            return span
+        delta = origin.delta
+        return span[0] + delta, span[1] + delta
+
+    @lexspan.setter
+    def lexspan(self, span):
+        origin = self._origin
+        if origin is not None and span is not None and origin.delta:
+            span = span[0] - origin.delta, span[1] - origin.delta
+        self._lexspan = span
+
+    @property
+    def lines(self):
+        '''
+        Line index of the source, kept only by the ProtoFile at the root of the tree and found through the parents.
+        None for a node not attached to a parsed file.
+        '''
+        node = self
+        while node.parent is not None:
+            node = node.parent
+        return None if node is self else node.lines
+
+    @property
+    def linespan(self):
+        '''
+        (first, last) line of the node, resolved from lexspan by the line index of the source.
+        '''
+        lines = self.lines
+        if lines is None:
+            return None
+        return lines.linespan(self.lexspan)
 
     def v(self, obj, visitor):
-        if obj == None:
-            return
-        elif hasattr(obj, "accept"):
-            obj.accept(visitor)
-        elif isinstance(obj, list):
-            for s in obj:
-                self.v(s, visitor)
-            pass
-        pass
+        # Visits a node, an LU or a list of them, see SourceElement.accept.
+        _traverse(obj, visitor.visit, None, True)
 
     @staticmethod
     def p(obj, parent):
@@ -62,23 +156,25 @@ class Base(object):
         if hasattr(obj, "parent"):
             obj.parent = parent
 
-# Lexical unit - contains lexspan and linespan for later analysis.
+# Lexical unit - contains lexspan for later analysis.
 class LU(Base):
+    __slots__ = ('p', 'idx', 'pval')
+
     def __init__(self, p, idx):
-        self.p = p
+        super(LU, self).__init__()
+        # Lean trees keep only spans, no reference to the parser objects.
+        self.p = None if getattr(p.parser, 'lean', False) else p
         self.idx = idx
         self.pval = p[idx]
-        self.lexspan = p.lexspan(idx)
-        self.linespan = p.linespan(idx)
-
-        # If string is in the value (raw value) and start and stop lexspan is the same, add real span
-        # obtained by string length.
-        if isinstance(self.pval, str) \
-                and self.lexspan != None \
-                and self.lexspan[0] == self.lexspan[1] \
-                and self.lexspan[0] != 0:
-            self.lexspan = tuple([self.lexspan[0], self.lexspan[0] + len(self.pval)])
-        super(LU, self).__init__()
+        self._origin = p.parser.context.origin
+
+        # Raw token value spans the token text, otherwise take over the span of the wrapped node.
+        if isinstance(self.pval, str):
+            pos = p.lexpos(idx)
+            self.lexspan = (pos, pos + len(self.pval))
+        else:
+            self.lexspan = getattr(self.pval, 'lexspan', None)
+            Base.p(self.pval, self)
 
     @staticmethod
     def i(p, idx):
@@ -102,16 +198,41 @@ class LU(Base):
         for x in self.pval:
             yield x
 
+def _children_getter(fields):
+    '''
+    Returns a function reading the given fields of a node into a tuple.
+    '''
+    if not fields:
+        return lambda node: ()
+    if len(fields) == 1:
+        get = operator.attrgetter(fields[0])
+        return lambda node: (get(node),)
+    return operator.attrgetter(*fields)
+
 # Base node
 class SourceElement(Base):
     '''
     A SourceElement is the base class for all elements that occur in a Protocol Buffers
-    file parsed by plyproto.
+    file parsed by plyproto. Subclasses list their fields in the class-level _fields tuple,
+    and in _children the fields holding child nodes (a node, possibly in an LU, or a list of them),
+    in the order accept() visits them - source order, except that a field definition visits its name before
+    its type. The children accessor of each class is built from _children when the class is created.
     '''
-    def __init__(self, linespan=[], lexspan=[], p=None):
+    _fields = ()
+    _children = ()
+    _visit_name = None
+    # Leaf nodes are visited without their children by accept() and traverse().
+    _leaf = False
+    __slots__ = ('p',)
+
+    _get_children = staticmethod(_children_getter(()))
+
+    def __init_subclass__(cls, **kwargs):
+        super(SourceElement, cls).__init_subclass__(**kwargs)
+        cls._get_children = staticmethod(_children_getter(cls._children))
+
+    def __init__(self, lexspan=None, p=None):
         super(SourceElement, self).__init__()
-        self._fields = [] # ['linespan', 'lexspan']
-        self.linespan = linespan
         self.lexspan = lexspan
         self.p = p
 
@@ -122,85 +243,129 @@ class SourceElement(Base):
         return "{0}({1})".format(self.__class__.__name__, args)
 
     def __eq__(self, other):
-        try:
-            return self.__dict__ == other.__dict__
-        except AttributeError:
+        if type(self) is not type(other):
             return False
+        if self.lexspan != other.lexspan:
+            return False
+        for k in self._fields:
+            if getattr(self, k) != getattr(other, k):
+                return False
+        return True
 
     def __ne__(self, other):
         return not self == other
 
-    def setLexData(self, linespan, lexspan):
-        self.linespan = linespan
+    def setLexData(self, lexspan, origin=None):
+        self._origin = origin
         self.lexspan = lexspan
 
     def setLexObj(self, p):
         self.p = p
 
+    def iter_children(self):
+        '''
+        Yields the child nodes, in the order of _children.
+        '''
+        for x in self._get_children(self):
+            if x.__class__ is LU:
+                x = x.pval
+            if isinstance(x, SourceElement):
+                yield x
+            elif x.__class__ is list:
+                for y in x:
+                    if y.__class__ is LU:
+                        y = y.pval
+                    if isinstance(y, SourceElement):
+                        yield y
+
+    def walk(self):
+        '''
+        Yields this node and all nodes below it, depth first in the order of _children, leaf nodes included.
+        '''
+        stack = [self]
+        pop, push = stack.pop, stack.append
+        while stack:
+            node = pop()
+            yield node
+            children = node._get_children(node)
+            if children:
+                _push_children(stack, children)
+
     def accept(self, visitor):
-        pass
+        '''
+        Passes this node and the nodes below it to visitor.visit, the children of a node only if it returns True.
+        Runs on traverse(), so the depth of the tree is not limited.
+        '''
+        _traverse(self, visitor.visit, None, True)
 
 class PackageStatement(SourceElement):
-    def __init__(self, name, linespan=None, lexspan=None, p=None):
-        super(PackageStatement, self).__init__(linespan=linespan, lexspan=lexspan, p=p)
-        self._fields += ['name']
+    _fields = ('name',)
+    _children = ('name',)
+    _leaf = True
+    __slots__ = _fields
+
+    def __init__(self, name, lexspan=None, p=None):
+        super(PackageStatement, self).__init__(lexspan=lexspan, p=p)
         self.name = name
         Base.p(self.name, self)
 
-    def accept(self, visitor):
-        visitor.visit_PackageStatement(self)
 
 class ImportStatement(SourceElement):
-    def __init__(self, name, linespan=None, lexspan=None, p=None):
-        super(ImportStatement, self).__init__(linespan=linespan, lexspan=lexspan, p=p)
-        self._fields += ['name']
+    _fields = ('name',)
+    _children = ('name',)
+    _leaf = True
+    __slots__ = _fields
+
+    def __init__(self, name, lexspan=None, p=None):
+        super(ImportStatement, self).__init__(lexspan=lexspan, p=p)
         self.name = name
         Base.p(self.name, self)
 
-    def accept(self, visitor):
-        visitor.visit_ImportStatement(self)
 
 class OptionStatement(SourceElement):
-    def __init__(self, name, value, linespan=None, lexspan=None, p=None):
-        super(OptionStatement, self).__init__(linespan=linespan, lexspan=lexspan, p=p)
-        self._fields += ['name', 'value']
+    _fields = ('name', 'value')
+    _children = ('name', 'value')
+    _leaf = True
+    __slots__ = _fields
+
+    def __init__(self, name, value, lexspan=None, p=None):
+        super(OptionStatement, self).__init__(lexspan=lexspan, p=p)
         self.name = name
         Base.p(self.name, self)
         self.value = value
         Base.p(self.value, self)
 
-    def accept(self, visitor):
-        visitor.visit_OptionStatement(self)
 
 class FieldDirective(SourceElement):
-    def __init__(self, name, value, linespan=None, lexspan=None, p=None):
-        super(FieldDirective, self).__init__(linespan=linespan, lexspan=lexspan, p=p)
-        self._fields += ['name', 'value']
+    _fields = ('name', 'value')
+    _children = ('name', 'value')
+    __slots__ = _fields
+
+    def __init__(self, name, value, lexspan=None, p=None):
+        super(FieldDirective, self).__init__(lexspan=lexspan, p=p)
         self.name = name
         Base.p(self.name, self)
         self.value = value
         Base.p(self.value, self)
 
-    def accept(self, visitor):
-        if visitor.visit_FieldDirective(self):
-            self.v(self.name, visitor)
-            self.v(self.value, visitor)
 
 class FieldType(SourceElement):
-    def __init__(self, name, linespan=None, lexspan=None, p=None):
-        super(FieldType, self).__init__(linespan=linespan, lexspan=lexspan, p=p)
-        self._fields += ['name']
+    _fields = ('name',)
+    __slots__ = _fields
+
+    def __init__(self, name, lexspan=None, p=None):
+        super(FieldType, self).__init__(lexspan=lexspan, p=p)
         self.name = name
         Base.p(self.name, self)
 
-    def accept(self, visitor):
-        if visitor.visit_FieldType(self):
-            self.v(self.name, visitor)
 
 class FieldDefinition(SourceElement):
-    def __init__(self, field_modifier, ftype, name, fieldId, fieldDirective, linespan=None, lexspan=None, p=None):
-        super(FieldDefinition, self).__init__(linespan=linespan, lexspan=lexspan, p=p)
-        self._fields += ['field_modifier', 'ftype', 'name', 'fieldId', 'fieldDirective']
+    _fields = ('field_modifier', 'ftype', 'name', 'fieldId', 'fieldDirective')
+    _children = ('name', 'ftype', 'fieldDirective')
+    __slots__ = _fields
+
+    def __init__(self, field_modifier, ftype, name, fieldId, fieldDirective, lexspan=None, p=None):
+        super(FieldDefinition, self).__init__(lexspan=lexspan, p=p)
         self.name = name
         Base.p(self.name, self)
         self.field_modifier = field_modifier
@@ -212,133 +377,122 @@ class FieldDefinition(SourceElement):
         self.fieldDirective = fieldDirective
         Base.p(self.fieldDirective, self)
 
-    def accept(self, visitor):
-        if visitor.visit_FieldDefinition(self):
-            self.v(self.name, visitor)
-            self.v(self.field_modifier, visitor)
-            self.v(self.ftype, visitor)
-            self.v(self.fieldId, visitor)
-            self.v(self.fieldDirective, visitor)
 
 class EnumFieldDefinition(SourceElement):
-    def __init__(self, name, fieldId, linespan=None, lexspan=None, p=None):
-        super(EnumFieldDefinition, self).__init__(linespan=linespan, lexspan=lexspan, p=p)
-        self._fields += ['name', 'fieldId']
+    _fields = ('name', 'fieldId')
+    _children = ('name',)
+    __slots__ = _fields
+
+    def __init__(self, name, fieldId, lexspan=None, p=None):
+        super(EnumFieldDefinition, self).__init__(lexspan=lexspan, p=p)
         self.name = name
         Base.p(self.name, self)
         self.fieldId = fieldId
         Base.p(self.fieldId, self)
 
-    def accept(self, visitor):
-        if visitor.visit_EnumFieldDefinition(self):
-            self.v(self.name, visitor)
-            self.v(self.fieldId, visitor)
 
 class EnumDefinition(SourceElement):
-    def __init__(self, name, body, linespan=None, lexspan=None, p=None):
-        super(EnumDefinition, self).__init__(linespan=linespan, lexspan=lexspan, p=p)
-        self._fields += ['name', 'body']
+    _fields = ('name', 'body')
+    _children = ('name', 'body')
+    __slots__ = _fields
+
+    def __init__(self, name, body, lexspan=None, p=None):
+        super(EnumDefinition, self).__init__(lexspan=lexspan, p=p)
         self.name = name
         Base.p(self.name, self)
         self.body = body
         Base.p(self.body, self)
 
-    def accept(self, visitor):
-        if visitor.visit_EnumDefinition(self):
-            self.v(self.name, visitor)
-            self.v(self.body, visitor)
 
 class MessageDefinition(SourceElement):
-    def __init__(self, name, body, linespan=None, lexspan=None, p=None):
-        super(MessageDefinition, self).__init__(linespan=linespan, lexspan=lexspan, p=p)
-        self._fields += ['name', 'body']
+    _fields = ('name', 'body')
+    _children = ('name', 'body')
+    __slots__ = _fields
+
+    def __init__(self, name, body, lexspan=None, p=None):
+        super(MessageDefinition, self).__init__(lexspan=lexspan, p=p)
         self.name = name
         Base.p(self.name, self)
         self.body = body
         Base.p(self.body, self)
 
-    def accept(self, visitor):
-        if visitor.visit_MessageDefinition(self):
-            self.v(self.name, visitor)
-            self.v(self.body, visitor)
 
 class MessageExtension(SourceElement):
-    def __init__(self, name, body, linespan=None, lexspan=None, p=None):
-        super(MessageExtension, self).__init__(linespan=linespan, lexspan=lexspan, p=p)
-        self._fields += ['name', 'body']
+    _fields = ('name', 'body')
+    _children = ('name', 'body')
+    __slots__ = _fields
+
+    def __init__(self, name, body, lexspan=None, p=None):
+        super(MessageExtension, self).__init__(lexspan=lexspan, p=p)
         self.name = name
         Base.p(self.name, self)
         self.body = body
         Base.p(self.body, self)
 
-    def accept(self, visitor):
-        if visitor.visit_MessageExtension(self):
-            self.v(self.name, visitor)
-            self.v(self.body, visitor)
 
 class MethodDefinition(SourceElement):
-    def __init__(self, name, name2, name3, linespan=None, lexspan=None, p=None):
-        super(MethodDefinition, self).__init__(linespan=linespan, lexspan=lexspan, p=p)
-        self._fields += ['name', 'name2', 'name3']
+    _fields = ('name', 'name2', 'name3')
+    _children = ('name', 'name2', 'name3')
+    __slots__ = _fields
+
+    def __init__(self, name, name2, name3, lexspan=None, p=None):
+        super(MethodDefinition, self).__init__(lexspan=lexspan, p=p)
         self.name = name
         Base.p(self.name, self)
         self.name2 = name2
-        Base.p(self.name, self)
+        Base.p(self.name2, self)
         self.name3 = name3
-        Base.p(self.name, self)
+        Base.p(self.name3, self)
 
-    def accept(self, visitor):
-        if visitor.visit_MethodDefinition(self):
-            self.v(self.name, visitor)
-            self.v(self.name2, visitor)
-            self.v(self.name3, visitor)
 
 class ServiceDefinition(SourceElement):
-    def __init__(self, name, body, linespan=None, lexspan=None, p=None):
-        super(ServiceDefinition, self).__init__(linespan=linespan, lexspan=lexspan, p=p)
-        self._fields += ['name', 'body']
+    _fields = ('name', 'body')
+    _children = ('name', 'body')
+    __slots__ = _fields
+
+    def __init__(self, name, body, lexspan=None, p=None):
+        super(ServiceDefinition, self).__init__(lexspan=lexspan, p=p)
         self.name = name
         Base.p(self.name, self)
         self.body = body
         Base.p(self.body, self)
 
-    def accept(self, visitor):
-        if visitor.visit_ServiceDefinition(self):
-            self.v(self.name, visitor)
-            self.v(self.body, visitor)
 
 class ExtensionsMax(SourceElement):
-    pass
+    __slots__ = ()
 
 class ExtensionsDirective(SourceElement):
-    def __init__(self, fromVal, toVal, linespan=None, lexspan=None, p=None):
-        super(ExtensionsDirective, self).__init__(linespan=linespan, lexspan=lexspan, p=p)
-        self._fields += ['fromVal', 'toVal']
+    _fields = ('fromVal', 'toVal')
+    _children = ('toVal',)
+    # ExtensionsMax of 'to max' is not passed to visitors.
+    _leaf = True
+    __slots__ = _fields
+
+    def __init__(self, fromVal, toVal, lexspan=None, p=None):
+        super(ExtensionsDirective, self).__init__(lexspan=lexspan, p=p)
         self.fromVal = fromVal
         Base.p(self.fromVal, self)
         self.toVal = toVal
         Base.p(self.toVal, self)
 
-    def accept(self, visitor):
-        if visitor.visit_ExtensionsDirective(self):
-            self.v(self.fromVal, visitor)
-            self.v(self.toVal, visitor)
 
 class Literal(SourceElement):
+    _fields = ('value',)
+    _leaf = True
+    __slots__ = _fields
 
-    def __init__(self, value, linespan=None, lexspan=None, p=None):
-        super(Literal, self).__init__(linespan=linespan, lexspan=lexspan, p=p)
-        self._fields += ['value']
+    def __init__(self, value, lexspan=None, p=None):
+        super(Literal, self).__init__(lexspan=lexspan, p=p)
         self.value = value
 
-    def accept(self, visitor):
-        visitor.visit_Literal(self)
 
 class Name(SourceElement):
+    _fields = ('value',)
+    _leaf = True
+    __slots__ = _fields
 
-    def __init__(self, value, linespan=None, lexspan=None, p=None):
-        super(Name, self).__init__(linespan=linespan, lexspan=lexspan, p=p)
-        self._fields += ['value']
+    def __init__(self, value, lexspan=None, p=None):
+        super(Name, self).__init__(lexspan=lexspan, p=p)
         self.value = value
         self.deriveLex()
 
@@ -350,46 +504,165 @@ class Name(SourceElement):
 
     def deriveLex(self):
         if hasattr(self.value, "lexspan"):
+            self._origin = self.value._origin
             self.lexspan = self.value.lexspan
-            self.linespan = self.value.linespan
+            Base.p(self.value, self)
         else:
             return
 
-    def accept(self, visitor):
-        visitor.visit_Name(self)
 
 class DotName(Name):
-    elements = []
-    def __init__(self, elements, linespan=None, lexspan=None, p=None):
-        super(DotName, self).__init__('.'.join([str(x) for x in elements]), linespan=linespan, lexspan=lexspan, p=p)
-        self._fields += ['elements']
+    _fields = Name._fields + ('elements',)
+    __slots__ = ('elements',)
+
+    def __init__(self, elements, lexspan=None, p=None, absolute=False):
         self.elements = elements
-        self.deriveLex()
+        value = '.'.join([str(x) for x in elements])
+        # Fully qualified name, written with a leading dot.
+        if absolute:
+            value = '.' + value
+        # Reuse the already known string of the same name.
+        value = sys.intern(value)
+        super(DotName, self).__init__(value, lexspan=lexspan, p=p)
 
     def deriveLex(self):
         if isinstance(self.elements, list) and len(self.elements)>0:
-            self.lexspan = (min([x.lexspan[0] for x in self.elements if x.lexspan[0] != 0]), max([x.lexspan[1] for x in self.elements if x.lexspan[1] != 0]))
-            self.linespan = (min([x.linespan[0] for x in self.elements if x.linespan[0] != 0]), max([x.linespan[1] for x in self.elements if x.linespan[1] != 0]))
+            self._origin = self.elements[0]._origin
+            self.lexspan = (min([x.lexspan[0] for x in self.elements]), max([x.lexspan[1] for x in self.elements]))
+            Base.p(self.elements, self)
         elif hasattr(self.elements, "lexspan"):
+            self._origin = self.elements._origin
             self.lexspan = self.elements.lexspan
-            self.linespan = self.elements.linespan
+            Base.p(self.elements, self)
         else:
             return
 
-    def accept(self, visitor):
-        visitor.visit_DotName(self)
 
 class ProtoFile(SourceElement):
-
-    def __init__(self, pkg, body, linespan=None, lexspan=None, p=None):
-        super(ProtoFile, self).__init__(linespan=linespan, lexspan=lexspan, p=p)
-        self._fields += ['pkg', 'body']
+    _fields = ('pkg', 'body')
+    _children = ('pkg', 'body')
+    _visit_name = 'visit_Proto'
+    # The line index of the whole source is kept only here, see Base.lines.
+    __slots__ = _fields + ('lines', 'trivia', 'diagnostics', 'index', 'symtab')
+
+    def __init__(self, pkg, body, lexspan=None, lines=None, p=None):
+        super(ProtoFile, self).__init__(lexspan=lexspan, p=p)
+        self.lines = lines
+        self.trivia = None
+        self.diagnostics = None
+        self.index = None
+        self.symtab = None
         self.pkg = pkg
         Base.p(self.pkg, self)
         self.body = body
         Base.p(self.body, self)
 
-    def accept(self, visitor):
-        if visitor.visit_Proto(self):
-            self.v(self.pkg, visitor)
-            self.v(self.body, visitor)
+    def doc_comment(self, node):
+        '''
+        Returns the comments directly preceding a node of this file, if parsed with trivia.
+        '''
+        if self.trivia is None or self.lines is None or self.lines.source is None:
+            return None
+        return self.trivia.doc_comment(self.lines.source, node)
+
+    def nodes_of(self, cls):
+        '''
+        Returns the nodes of exactly the class cls in document order. Kinds recorded by a parse with index set
+        are returned from the index directly (the list is shared, do not modify it), other kinds by a tree walk.
+        '''
+        if self.index is not None:
+            nodes = self.index.get(cls)
+            if nodes is not None:
+                return nodes
+        return [node for node in self.walk() if node.__class__ is cls]
+
+    def symbols(self):
+        '''
+        Returns the symbols.SymbolTable of the file with all type references resolved, built on the first call.
+        '''
+        if self.symtab is None:
+            from .symbols import SymbolTable
+            self.symtab = SymbolTable(self)
+        return self.symtab
+
+
+def shift_spans(stmt, delta):
+    '''
+    Moves lexspans of a top level statement and all nodes below it by delta, e.g., after an edit of the source
+    before it. Nodes of a parsed statement share its SpanOrigin and are moved at once. Nodes without one
+    (e.g., loaded from an AST file) get a new one on the first move.
+    '''
+    origin = stmt._origin
+    if origin is None:
+        origin = SpanOrigin()
+        stack = [stmt]
+        pop, push, extend = stack.pop, stack.append, stack.extend
+        while stack:
+            obj = pop()
+            if isinstance(obj, list):
+                extend(obj)
+            elif isinstance(obj, Base):
+                span = obj.lexspan
+                obj._origin = origin
+                obj._lexspan = span
+                if isinstance(obj, LU):
+                    push(obj.pval)
+                elif isinstance(obj, SourceElement):
+                    for k in obj._fields:
+                        push(getattr(obj, k))
+    origin.delta += delta
+
+# Callback results of traverse() - skip the children of the node, end the walk.
+PRUNE = object()
+STOP = object()
+
+def traverse(root, enter=None, leave=None):
+    '''
+    Walks the nodes (SourceElements) under root, itself included, depth first in the order of _children,
+    with an explicit stack instead of recursion, so the depth of the tree is not limited.
+    LUs and lists are walked through. Like accept(), it does not descend into leaf nodes (package, import
+    and option statements, extensions directives, names and literals). enter(node) is called before the children
+    of the node, leave(node) after them. enter may return PRUNE (or False) to skip the children, leave is still called.
+    Either callback may return STOP to end the walk. Returns False if the walk was stopped, True otherwise.
+    '''
+    return _traverse(root, enter, leave, False)
+
+def _traverse(root, enter, leave, visiting):
+    # With visiting set the children are skipped for any false result of enter, as accept() does.
+    # Only nodes and pending leaves (1-tuples) are put on the stack.
+    stack = []
+    _push_children(stack, [root])
+    pop, push = stack.pop, stack.append
+    while stack:
+        obj = pop()
+        cls = obj.__class__
+        if cls is tuple:
+            if leave(obj[0]) is STOP:
+                return False
+            continue
+        res = enter(obj) if enter is not None else None
+        if res is STOP:
+            return False
+        if leave is not None:
+            push((obj,))
+        if cls._leaf or (not res if visiting else res is PRUNE or res is False):
+            continue
+        # _push_children inlined for the fields of the node
+        for x in reversed(cls._get_children(obj)):
+            if x.__class__ is LU:
+                x = x.pval
+            if isinstance(x, SourceElement):
+                push(x)
+            elif x.__class__ is list:
+                _push_children(stack, x)
+    return True
+
+def _push_children(stack, items):
+    # Pushes nodes of a list (and nested lists and LUs) to the stack, last to first.
+    for x in reversed(items):
+        if x.__class__ is LU:
+            x = x.pval
+        if isinstance(x, SourceElement):
+            stack.append(x)
+        elif isinstance(x, list):
+            _push_children(stack, x)
@@ -3,15 +3,43 @@ __copyright__ = "Copyright (C) 2014 Dusan (ph4r05) Klinec"
 __license__ = "Apache License, Version 2.0"
 __version__ = "1.0"
 
+import os
+import mmap
+import codecs
+import sys
+import threading
+import types
+import hashlib
+import marshal
+import functools
+import itertools
+import importlib
+import collections
 import ply.lex as lex
 import ply.yacc as yacc
 from .model import *
+from .tokenbuffer import TokenBuffer
+from .lineindex import LineIndex
+from .trivia import Trivia, LINE_COMMENT, BLOCK_COMMENT
+from .diagnostics import Diagnostics, MAX_DIAGNOSTICS
+
+# Prebuilt lexer/parser tables are shipped inside the package, next to this module.
+# Regenerate them with `python -m plyproto.gentables` whenever the grammar changes.
+TABLE_DIR = os.path.dirname(os.path.abspath(__file__))
+LEXTAB = 'plyproto.lextab'
+PARSETAB = 'plyproto.parsetab'
+
+DEFAULT_ENCODING = 'utf-8'
+# Files at least this large are read through mmap.
+MMAP_THRESHOLD = 4 * 1024 * 1024
 
 class ProtobufLexer(object):
     keywords = ('double', 'float', 'int32', 'int64', 'uint32', 'uint64', 'sint32', 'sint64',
                 'fixed32', 'fixed64', 'sfixed32', 'sfixed64', 'bool', 'string', 'bytes',
                 'message', 'required', 'optional', 'repeated', 'enum', 'extensions', 'max', 'extends', 'extend',
                 'to', 'package', 'service', 'rpc', 'returns', 'true', 'false', 'option', 'import')
+    # Keyword -> token type mapping.
+    keyword_types = dict((k, k.upper()) for k in keywords)
 
     tokens = [
         'NAME',
@@ -29,10 +57,18 @@ class ProtobufLexer(object):
     t_NUM = r'[+-]?\d+'
     t_STRING_LITERAL = r'\"([^\\\n]|(\\.))*?\"'
 
-    t_ignore_LINE_COMMENT = '//.*'
+    # Comment rules produce no tokens, they are only recorded to lexer.trivia if it is set.
+    trivia_kinds = {'t_LINE_COMMENT': LINE_COMMENT, 't_BLOCK_COMMENT': BLOCK_COMMENT}
+
+    def t_LINE_COMMENT(self, t):
+        '//.*'
+        if t.lexer.trivia is not None:
+            t.lexer.trivia.add(LINE_COMMENT, t.lexpos, t.lexpos + len(t.value))
+
     def t_BLOCK_COMMENT(self, t):
         r'/\*(.|\n)*?\*/'
-        t.lexer.lineno += t.value.count('\n')
+        if t.lexer.trivia is not None:
+            t.lexer.trivia.add(BLOCK_COMMENT, t.lexpos, t.lexpos + len(t.value))
 
     t_LBRACE = '{'
     t_RBRACE = '}'
@@ -44,75 +80,197 @@ class ProtobufLexer(object):
     t_SEMI = ';'
     t_DOT = '\\.'
     t_ignore = ' \t\f'
-    t_STARTTOKEN = '\\+'
+    # Lines are not counted while lexing, they are resolved from offsets by LineIndex.
+    t_ignore_newline = r'(\r?\n)+'
 
     def t_NAME(self, t):
         '[A-Za-z_$][A-Za-z0-9_$]*'
-        if t.value in ProtobufLexer.keywords:
-            #print "type: %s val %s t %s" % (t.type, t.value, t)
-            t.type = t.value.upper()
+        # Identifiers are interned, a string is freed once no tree refers to it.
+        t.value = sys.intern(t.value)
+        t.type = self.keyword_types.get(t.value, 'NAME')
         return t
 
-    def t_newline(self, t):
-        r'\n+'
-        t.lexer.lineno += len(t.value)
-
-    def t_newline2(self, t):
-        r'(\r\n)+'
-        t.lexer.lineno += len(t.value) / 2
-
     def t_error(self, t):
-        print("Illegal character '{}' ({}) in line {}".format(t.value[0], hex(ord(t.value[0])), t.lexer.lineno))
+        if t.lexer.diagnostics is not None:
+            t.lexer.diagnostics.add_illegal(t.lexpos, t.value[0])
+        else:
+            line = t.lexer.lexdata.count('\n', 0, t.lexpos) + t.lexer.lineno
+            print("Illegal character '{}' ({}) in line {}".format(t.value[0], hex(ord(t.value[0])), line))
         t.lexer.skip(1)
 
 class LexHelper:
-    offset = 0
-    def get_max_linespan(self, p):
-        defSpan=[1e60, -1]
-        mSpan=[1e60, -1]
-        for sp in range(0, len(p)):
-            csp = p.linespan(sp)
-            if csp[0] == 0 and csp[1] == 0:
-                if hasattr(p[sp], "linespan"):
-                    csp = p[sp].linespan
-                else:
+    def __init__(self, lean=False):
+        self.lean = lean
+
+    @staticmethod
+    def get_spans(obj):
+        '''
+        Returns lexspan of a parsed value - node, LU or a list of them.
+        '''
+        if isinstance(obj, list):
+            if len(obj) == 0:
+                return None
+            first = LexHelper.get_spans(obj[0])
+            last = first if len(obj) == 1 else LexHelper.get_spans(obj[-1])
+            if first is None or last is None:
+                return None
+            return first[0], last[1]
+        return getattr(obj, 'lexspan', None)
+
+    def get_max_spans(self, p):
+        '''
+        Returns lexspan covering all symbols of the production.
+        Lexspan is a half-open interval of offsets into the source, None if no symbol has a position.
+        '''
+        lexspan = None
+        for sym in p.slice[1:]:
+            val = sym.value
+            if isinstance(val, str):
+                pos = sym.lexpos
+                csp = (pos, pos + len(val))
+            else:
+                csp = self.get_spans(val)
+                if csp is None:
                     continue
-            if csp == None or len(csp) != 2: continue
-            if csp[0] == 0 and csp[1] == 0: continue
-            if csp[0] < mSpan[0]: mSpan[0] = csp[0]
-            if csp[1] > mSpan[1]: mSpan[1] = csp[1]
-        if defSpan == mSpan: return (0,0)
-        return tuple([mSpan[0]-self.offset, mSpan[1]-self.offset])
-
-    def get_max_lexspan(self, p):
-        defSpan=[1e60, -1]
-        mSpan=[1e60, -1]
-        for sp in range(0, len(p)):
-            csp = p.lexspan(sp)
-            if csp[0] == 0 and csp[1] == 0:
-                if hasattr(p[sp], "lexspan"):
-                    csp = p[sp].lexspan
-                else:
-                    continue
-            if csp == None or len(csp) != 2: continue
-            if csp[0] == 0 and csp[1] == 0: continue
-            if csp[0] < mSpan[0]: mSpan[0] = csp[0]
-            if csp[1] > mSpan[1]: mSpan[1] = csp[1]
-        if defSpan == mSpan: return (0,0)
-        return tuple([mSpan[0]-self.offset, mSpan[1]-self.offset])
+            if lexspan is None:
+                lexspan = csp
+                continue
+            if csp[0] < lexspan[0]: lexspan = (csp[0], lexspan[1])
+            if csp[1] > lexspan[1]: lexspan = (lexspan[0], csp[1])
+        return lexspan
 
     def set_parse_object(self, dst, p):
-        dst.setLexData(linespan=self.get_max_linespan(p), lexspan=self.get_max_lexspan(p))
-        dst.setLexObj(p)
+        dst.setLexData(lexspan=self.get_max_spans(p), origin=p.parser.context.origin)
+        if not self.lean:
+            dst.setLexObj(p)
+
+class ParseContext(object):
+    '''
+    Holds all state of a single parse run - lexer and LR parser clones and the lex helper.
+    Grammar actions reach it via p.parser.context so one analyzer can be shared by threads.
+    In the lean mode the tree nodes keep only spans, no references to the parser objects.
+    Line numbers of the nodes are resolved by the LineIndex of the parsed source kept by the ProtoFile, lineno is
+    the first line. Lines are not counted while lexing, lineno of every token is the first line.
+    With trivia set, comments are recorded and attached to the parsed ProtoFile.
+    Lexical and syntax errors are recorded to diagnostics, at most max_diagnostics of them.
+    With index set, nodes of INDEXED_KINDS are recorded by kind as they are reduced, see ProtoFile.nodes_of.
+    '''
+    def __init__(self, lexer, parser, lineno=1, lean=False, trivia=False, max_diagnostics=MAX_DIAGNOSTICS, index=False):
+        self.lexer = lexer
+        self.lexer.lineno = lineno
+        self.lexer.trivia = self.trivia = Trivia() if trivia else None
+        self.lexer.diagnostics = self.diagnostics = Diagnostics(max_diagnostics)
+        self.lineno = lineno
+        self.lines = None
+        # Nodes of each top level statement share a span origin, see model.shift_spans.
+        self.origin = SpanOrigin()
+        self.index = dict((cls, []) for cls in INDEXED_KINDS) if index else None
+        self.parser = parser
+        self.parser.errorfunc = self.syntax_error
+        self.parser.context = self
+        self.parser.lean = lean
+        self.lean = lean
+        self.lh = LexHelper(lean)
+
+    def start_token(self):
+        '''
+        Synthetic STARTTOKEN fed to the parser before the source tokens.
+        '''
+        tok = lex.LexToken()
+        tok.type = 'STARTTOKEN'
+        tok.value = ''
+        tok.lineno = self.lexer.lineno
+        tok.lexpos = 0
+        return tok
+
+    def parse(self, code, debug=0):
+        # The source is lexed in place.
+        self.lexer.input(code)
+        return self.parse_tokens(iter(self.lexer.token, None), LineIndex(code, self.lineno), debug)
+
+    def parse_buffer(self, buf, debug=0):
+        # Tokens come from the buffer, the lexer is passed only to grammar actions.
+        # Lexical errors were recorded by the buffer, syntax errors are merged in source order.
+        self.trivia = buf.trivia
+        for diag in buf.diagnostics:
+            self.diagnostics.add(*diag)
+        self.diagnostics.dropped += buf.diagnostics.dropped
+        tree = self.parse_tokens(iter(buf), buf.lines, debug)
+        if buf.diagnostics:
+            self.diagnostics.sort(key=_diagnostic_start)
+        return tree
+
+    def parse_tokens(self, tokens, lines, debug=0):
+        '''
+        Parses the token iterator, lines is the line index of the source the tokens come from.
+        The start token is injected in front of the tokens.
+        '''
+        self.lines = self.diagnostics.lines = lines
+        tokens = itertools.chain((self.start_token(),), tokens)
+        tree = self.parser.parse(lexer=self.lexer, debug=debug, tokenfunc=functools.partial(next, tokens, None))
+        if tree is not None:
+            tree.lines = lines
+            tree.trivia = self.trivia
+            tree.diagnostics = self.diagnostics
+            if self.index is not None:
+                tree.index = self.finish_index(tree)
+        return tree
+
+    def finish_index(self, tree):
+        '''
+        Puts the recorded nodes to document order. Inner nodes are reduced before the outer ones,
+        so the lists are only nearly sorted. Nodes of statements dropped by error recovery may have been
+        recorded too, the index is then collected from the tree instead.
+        '''
+        index = self.index
+        if self.diagnostics:
+            for nodes in index.values():
+                del nodes[:]
+            for node in tree.walk():
+                nodes = index.get(node.__class__)
+                if nodes is not None:
+                    nodes.append(node)
+        else:
+            for nodes in index.values():
+                nodes.sort(key=_span_start)
+        return index
+
+    def syntax_error(self, tok):
+        '''
+        Error function of the LR parser, the parser then resynchronizes on the error productions.
+        '''
+        if tok is None:
+            end = len(self.lines.source)
+            self.diagnostics.add('syntax', 'Unexpected end of input', end, end)
+        else:
+            self.diagnostics.add('syntax', "Syntax error at '{}'".format(tok.value), tok.lexpos, tok.lexpos + len(tok.value))
+
+def _span_start(node):
+    return node.lexspan[0]
+
+def _diagnostic_start(diag):
+    return diag.start
+
+# Node classes recorded by the node-kind index, every grammar rule building them goes through set_parse_object.
+INDEXED_KINDS = (PackageStatement, ImportStatement, OptionStatement, FieldDirective, FieldType, DotName,
+                 FieldDefinition, EnumFieldDefinition, EnumDefinition, MessageDefinition, MessageExtension,
+                 MethodDefinition, ServiceDefinition, ExtensionsMax, ExtensionsDirective)
+
+# Token type codes of TokenBuffer, and the types whose values are interned.
+TOKEN_TYPES = tuple(ProtobufLexer.tokens) + tuple(ProtobufLexer.literals)
+NAME_TYPES = ('NAME',) + tuple(ProtobufLexer.keyword_types.values())
 
 class ProtobufParser(object):
     tokens = ProtobufLexer.tokens
-    offset = 0
-    lh = LexHelper()
 
-    def setOffset(self, of):
-        self.offset = of
-        self.lh.offset = of
+    @staticmethod
+    def set_parse_object(dst, p):
+        context = p.parser.context
+        context.lh.set_parse_object(dst, p)
+        if context.index is not None:
+            nodes = context.index.get(dst.__class__)
+            if nodes is not None:
+                nodes.append(dst)
 
     def p_empty(self, p):
         '''empty :'''
@@ -155,13 +313,13 @@ class ProtobufParser(object):
     def p_rvalue2(self, p):
         '''rvalue : NAME'''
         p[0] = Name(LU.i(p, 1))
-        self.lh.set_parse_object(p[0], p)
+        self.set_parse_object(p[0], p)
         p[0].deriveLex()
 
     def p_field_directive(self, p):
         '''field_directive : LBRACK NAME EQ rvalue RBRACK'''
         p[0] = FieldDirective(Name(LU.i(p, 2)), LU.i(p,4))
-        self.lh.set_parse_object(p[0], p)
+        self.set_parse_object(p[0], p)
 
     def p_field_directive_times(self, p):
         '''field_directive_times : field_directive_plus'''
@@ -177,7 +335,8 @@ class ProtobufParser(object):
         if len(p) == 2:
             p[0] = [LU(p,1)]
         else:
-            p[0] = p[1] + [LU(p,2)]
+            p[1].append(LU(p,2))
+            p[0] = p[1]
 
     def p_dotname(self, p):
         '''dotname : NAME
@@ -185,7 +344,8 @@ class ProtobufParser(object):
         if len(p) == 2:
             p[0] = [LU(p,1)]
         else:
-            p[0] = p[1] + [LU(p,3)]
+            p[1].append(LU(p,3))
+            p[0] = p[1]
 
     # Hack for cases when there is a field named 'message' or 'max'
     def p_fieldName(self, p):
@@ -193,31 +353,37 @@ class ProtobufParser(object):
                       | MESSAGE
                       | MAX'''
         p[0] = Name(LU.i(p,1))
-        self.lh.set_parse_object(p[0], p)
+        self.set_parse_object(p[0], p)
         p[0].deriveLex()
 
     def p_field_type(self, p):
         '''field_type : primitive_type'''
         p[0] = FieldType(LU.i(p,1))
-        self.lh.set_parse_object(p[0], p)
+        self.set_parse_object(p[0], p)
 
     def p_field_type2(self, p):
         '''field_type : dotname'''
         p[0] = DotName(LU.i(p, 1))
-        self.lh.set_parse_object(p[0], p)
+        self.set_parse_object(p[0], p)
         p[0].deriveLex()
 
+    # Fully qualified type name, the span includes the leading dot.
+    def p_field_type3(self, p):
+        '''field_type : DOT dotname'''
+        p[0] = DotName(LU.i(p, 2), absolute=True)
+        self.set_parse_object(p[0], p)
+
     # Root of the field declaration.
     def p_field_definition(self, p):
         '''field_definition : field_modifier field_type field_name EQ field_id field_directive_times SEMI'''
         p[0] = FieldDefinition(LU.i(p,1), LU.i(p,2), LU.i(p, 3), LU.i(p,5), LU.i(p,6))
-        self.lh.set_parse_object(p[0], p)
+        self.set_parse_object(p[0], p)
 
     # Root of the enum field declaration.
     def p_enum_field(self, p):
         '''enum_field : field_name EQ NUM SEMI'''
         p[0] = EnumFieldDefinition(LU.i(p, 1), LU.i(p,3))
-        self.lh.set_parse_object(p[0], p)
+        self.set_parse_object(p[0], p)
 
     def p_enum_body_part(self, p):
         '''enum_body_part : enum_field
@@ -230,7 +396,8 @@ class ProtobufParser(object):
         if len(p) == 2:
             p[0] = [p[1]]
         else:
-            p[0] = p[1] + [p[2]]
+            p[1].append(p[2])
+            p[0] = p[1]
 
     def p_enum_body_opt(self, p):
         '''enum_body_opt : empty'''
@@ -240,17 +407,33 @@ class ProtobufParser(object):
         '''enum_body_opt : enum_body'''
         p[0] = p[1]
 
+    # Error recovery - a broken enum field is skipped up to the next ';'.
+    # errok() reports the next error right away, not only after three more tokens.
+    def p_enum_body_error(self, p):
+        '''enum_body : enum_body error SEMI
+                    | error SEMI'''
+        p[0] = p[1] if len(p) == 4 else []
+        p.parser.errok()
+
     # Root of the enum declaration.
     # enum_definition ::= 'enum' ident '{' { ident '=' integer ';' }* '}'
     def p_enum_definition(self, p):
         '''enum_definition : ENUM NAME LBRACE enum_body_opt RBRACE'''
         p[0] = EnumDefinition(Name(LU.i(p, 2)), LU.i(p,4))
-        self.lh.set_parse_object(p[0], p)
+        self.set_parse_object(p[0], p)
+
+    # Error recovery - a broken last field is skipped up to the closing '}', the enum is kept.
+    def p_enum_definition_error(self, p):
+        '''enum_definition : ENUM NAME LBRACE enum_body error RBRACE
+                           | ENUM NAME LBRACE error RBRACE'''
+        p[0] = EnumDefinition(Name(LU.i(p, 2)), LU.i(p,4) if len(p) == 7 else [])
+        self.set_parse_object(p[0], p)
+        p.parser.errok()
 
     def p_extensions_to(self, p):
         '''extensions_to : MAX'''
         p[0] = ExtensionsMax()
-        self.lh.set_parse_object(p[0], p)
+        self.set_parse_object(p[0], p)
 
     def p_extensions_to2(self, p):
         '''extensions_to : NUM'''
@@ -260,13 +443,20 @@ class ProtobufParser(object):
     def p_extensions_definition(self, p):
         '''extensions_definition : EXTENSIONS NUM TO extensions_to SEMI'''
         p[0] = ExtensionsDirective(LU.i(p,2), LU.i(p,4))
-        self.lh.set_parse_object(p[0], p)
+        self.set_parse_object(p[0], p)
 
     # message_extension ::= 'extend' ident '{' message_body '}'
     def p_message_extension(self, p):
         '''message_extension : EXTEND NAME LBRACE message_body RBRACE'''
         p[0] = MessageExtension(Name(LU.i(p, 2)), LU.i(p,4))
-        self.lh.set_parse_object(p[0], p)
+        self.set_parse_object(p[0], p)
+
+    # Error recovery - a broken last field is skipped up to the closing '}', the extension is kept.
+    def p_message_extension_error(self, p):
+        '''message_extension : EXTEND NAME LBRACE message_body error RBRACE'''
+        p[0] = MessageExtension(Name(LU.i(p, 2)), LU.i(p,4))
+        self.set_parse_object(p[0], p)
+        p.parser.errok()
 
     def p_message_body_part(self, p):
         '''message_body_part : field_definition
@@ -288,20 +478,34 @@ class ProtobufParser(object):
         if len(p) == 2:
             p[0] = [p[1]]
         else:
-            p[0] = p[1] + [p[2]]
+            p[1].append(p[2])
+            p[0] = p[1]
+
+    # Error recovery - a broken message body part is skipped up to the next ';'.
+    def p_message_body_error(self, p):
+        '''message_body : message_body error SEMI'''
+        p[0] = p[1]
+        p.parser.errok()
 
     # Root of the message declaration.
     # message_definition = MESSAGE_ - ident("messageId") + LBRACE + message_body("body") + RBRACE
     def p_message_definition(self, p):
         '''message_definition : MESSAGE NAME LBRACE message_body RBRACE'''
         p[0] = MessageDefinition(Name(LU.i(p, 2)), LU.i(p,4))
-        self.lh.set_parse_object(p[0], p)
+        self.set_parse_object(p[0], p)
+
+    # Error recovery - a broken last body part is skipped up to the closing '}', the message is kept.
+    def p_message_definition_error(self, p):
+        '''message_definition : MESSAGE NAME LBRACE message_body error RBRACE'''
+        p[0] = MessageDefinition(Name(LU.i(p, 2)), LU.i(p,4))
+        self.set_parse_object(p[0], p)
+        p.parser.errok()
 
     # method_definition ::= 'rpc' ident '(' [ ident ] ')' 'returns' '(' [ ident ] ')' ';'
     def p_method_definition(self, p):
         '''method_definition : RPC NAME LPAR NAME RPAR RETURNS LPAR NAME RPAR'''
         p[0] = MethodDefinition(Name(LU.i(p, 2)), Name(LU.i(p, 4)), Name(LU.i(p, 8)))
-        self.lh.set_parse_object(p[0], p)
+        self.set_parse_object(p[0], p)
 
     def p_method_definition_opt(self, p):
         '''method_definition_opt : empty'''
@@ -313,26 +517,35 @@ class ProtobufParser(object):
         if len(p) == 2:
             p[0] = [p[1]]
         else:
-            p[0] = p[1] + [p[2]]
+            p[1].append(p[2])
+            p[0] = p[1]
 
     # service_definition ::= 'service' ident '{' method_definition* '}'
     # service_definition = SERVICE_ - ident("serviceName") + LBRACE + ZeroOrMore(Group(method_definition)) + RBRACE
     def p_service_definition(self, p):
         '''service_definition : SERVICE NAME LBRACE method_definition_opt RBRACE'''
         p[0] = ServiceDefinition(Name(LU.i(p, 2)), LU.i(p,4))
-        self.lh.set_parse_object(p[0], p)
+        self.set_parse_object(p[0], p)
+
+    # Error recovery - methods have no terminator, a broken method is skipped with the rest of the body
+    # up to the closing '}', the service is kept with the methods before it.
+    def p_service_definition_error(self, p):
+        '''service_definition : SERVICE NAME LBRACE method_definition_opt error RBRACE'''
+        p[0] = ServiceDefinition(Name(LU.i(p, 2)), LU.i(p,4))
+        self.set_parse_object(p[0], p)
+        p.parser.errok()
 
     # package_directive ::= 'package' ident [ '.' ident]* ';'
     def p_package_directive(self,p):
         '''package_directive : PACKAGE dotname SEMI'''
         p[0] = PackageStatement(Name(LU.i(p, 2)))
-        self.lh.set_parse_object(p[0], p)
+        self.set_parse_object(p[0], p)
 
     # import_directive = IMPORT_ - quotedString("importFileSpec") + SEMI
     def p_import_directive(self, p):
         '''import_directive : IMPORT STRING_LITERAL SEMI'''
         p[0] = ImportStatement(Literal(LU.i(p,2)))
-        self.lh.set_parse_object(p[0], p)
+        self.set_parse_object(p[0], p)
 
     def p_option_rvalue(self, p):
         '''option_rvalue : NUM
@@ -352,7 +565,7 @@ class ProtobufParser(object):
     def p_option_directive(self, p):
         '''option_directive : OPTION NAME EQ option_rvalue SEMI'''
         p[0] = OptionStatement(Name(LU.i(p, 2)), LU.i(p,4))
-        self.lh.set_parse_object(p[0], p)
+        self.set_parse_object(p[0], p)
 
     # topLevelStatement = Group(message_definition | message_extension | enum_definition | service_definition | import_directive | option_directive)
     def p_topLevel(self,p):
@@ -367,6 +580,7 @@ class ProtobufParser(object):
     def p_package_definition(self, p):
         '''package_definition : package_directive'''
         p[0] = p[1]
+        p.parser.context.origin = SpanOrigin()
 
     def p_packages2(self, p):
         '''package_definition : empty'''
@@ -378,17 +592,27 @@ class ProtobufParser(object):
         if len(p) == 2:
             p[0] = [p[1]]
         else:
-            p[0] = p[1] + [p[2]]
+            p[1].append(p[2])
+            p[0] = p[1]
+        p.parser.context.origin = SpanOrigin()
 
     def p_statements(self, p):
         '''statements : empty'''
         p[0] = []
 
+    # Error recovery - a broken top level statement is skipped up to the next ';' or '}'.
+    def p_statements_error(self, p):
+        '''statements : statements error SEMI
+                      | statements error RBRACE'''
+        p[0] = p[1]
+        p.parser.context.origin = SpanOrigin()
+        p.parser.errok()
+
     # parser = Optional(package_directive) + ZeroOrMore(topLevelStatement)
     def p_protofile(self, p):
         '''protofile : package_definition statements'''
         p[0] = ProtoFile(LU.i(p,1), LU.i(p,2))
-        self.lh.set_parse_object(p[0], p)
+        self.set_parse_object(p[0], p)
 
     # Parsing starting point
     def p_goal(self, p):
@@ -396,36 +620,288 @@ class ProtobufParser(object):
         p[0] = p[2]
 
     def p_error(self, p):
+        # Parse runs report to their ParseContext, see ParseContext.syntax_error
         print('error: {}'.format(p))
 
-class ProtobufAnalyzer(object):
+def lexer_signature(module=ProtobufLexer):
+    '''
+    Computes signature of the lexer specification (tokens, literals, rules).
+    Stored in the generated lextab so stale tables are never loaded.
+    '''
+    sig = hashlib.md5()
+    sig.update(' '.join(module.tokens).encode('latin-1'))
+    sig.update(module.literals.encode('latin-1'))
+    funcs = []
+    for name in sorted(dir(module)):
+        if not name.startswith('t_'):
+            continue
+        rule = getattr(module, name)
+        if isinstance(rule, str):
+            sig.update(('%s=%s;' % (name, rule)).encode('latin-1'))
+        else:
+            code = getattr(rule, '__code__', None)
+            funcs.append((code.co_firstlineno if code else 0, name, rule.__doc__ or ''))
+    for _, name, doc in sorted(funcs):
+        sig.update(('%s:%s;' % (name, doc)).encode('latin-1'))
+    return sig.hexdigest()
+
+# Modules whose code decides the parse tree and its pickled layout, their source is part of the parser signature.
+SIGNATURE_MODULES = ('parser', 'model', 'tokenbuffer', 'lineindex', 'trivia', 'diagnostics')
+
+_parser_signature = None
+
+def module_signature(module):
+    '''
+    Computes signature of the module code from its source, from the compiled code if the source is not available.
+    '''
+    loader = getattr(module, '__loader__', None)
+    source = loader.get_source(module.__name__) if loader is not None else None
+    if source is not None:
+        return hashlib.md5(source.encode('utf-8')).hexdigest()
+    code = loader.get_code(module.__name__) if loader is not None else None
+    if code is None:
+        raise ValueError('No code of module %s' % module.__name__)
+    return hashlib.md5(marshal.dumps(code)).hexdigest()
+
+def parser_signature():
+    '''
+    Computes signature of the lexer and grammar specification and of the code of the parser and model
+    modules, so it changes whenever parsing may produce a different tree. Computed once per process.
+    '''
+    global _parser_signature
+    if _parser_signature is None:
+        sig = hashlib.md5()
+        sig.update(lexer_signature().encode('latin-1'))
+        pinfo = yacc.ParserReflect(dict((k, getattr(ProtobufParser, k)) for k in dir(ProtobufParser)), log=yacc.NullLogger())
+        pinfo.get_all()
+        sig.update(pinfo.signature())
+        for name in SIGNATURE_MODULES:
+            module = importlib.import_module('.' + name, __package__)
+            sig.update(('%s:%s;' % (name, module_signature(module))).encode('latin-1'))
+        _parser_signature = sig.hexdigest()
+    return _parser_signature
+
+def _load_table(modname):
+    if isinstance(modname, types.ModuleType):
+        return modname
+    try:
+        return importlib.import_module(modname)
+    except ImportError:
+        return None
+
+def build_lexer(lextab=LEXTAB):
+    '''
+    Builds the lexer from the prebuilt table module if its signature matches,
+    otherwise falls back to building the lexer by reflection (nothing is written).
+    '''
+    tab = _load_table(lextab) if lextab else None
+    if tab is not None and getattr(tab, '_signature', None) == lexer_signature():
+        lexer = lex.lex(module=ProtobufLexer(), optimize=1, lextab=tab)
+    else:
+        lexer = lex.lex(module=ProtobufLexer())
+
+    lexer.trivia = None
+    lexer.diagnostics = None
+    return lexer
+
+def build_parser(tabmodule=PARSETAB):
+    '''
+    Builds the parser from the prebuilt table module. Yacc checks the grammar
+    signature stored in the table, the tables are regenerated in memory if stale.
+    '''
+    return yacc.yacc(module=ProtobufParser(), start='goal', debug=0, tabmodule=tabmodule, write_tables=0,
+                     errorlog=yacc.NullLogger())
+
+def write_tables(outputdir=TABLE_DIR):
+    '''
+    Generates lextab.py and parsetab.py into the output directory (the package directory by default).
+    '''
+    lexer = lex.lex(module=ProtobufLexer())
+    lexer.writetab(LEXTAB, outputdir)
+    with open(os.path.join(outputdir, LEXTAB.split('.')[-1] + '.py'), 'a') as f:
+        f.write('_signature = %r\n' % lexer_signature())
+
+    # Avoid picking up a stale table module, yacc writes the table only when it regenerates it.
+    tabfile = os.path.join(outputdir, PARSETAB.split('.')[-1] + '.py')
+    if os.path.exists(tabfile):
+        os.remove(tabfile)
+    sys.modules.pop(PARSETAB, None)
+    yacc.yacc(module=ProtobufParser(), start='goal', debug=0, tabmodule=PARSETAB, outputdir=outputdir)
+
+    # Do not leak the absolute build paths into the shipped table.
+    with open(tabfile) as f:
+        lines = f.readlines()
+    lines[1] = '# %s\n' % os.path.basename(tabfile)
+    source = os.path.abspath(__file__).replace('.pyc', '.py')
+    lines = [l.replace(repr(source), repr(os.path.basename(source))) for l in lines]
+    with open(tabfile, 'w') as f:
+        f.writelines(lines)
+
+def read_source(source, encoding=DEFAULT_ENCODING, mmap_threshold=MMAP_THRESHOLD):
+    '''
+    Returns the source text. Accepts a path, a file object (text or binary) or raw bytes.
+    Files are read in one go, files larger than mmap_threshold are decoded directly from a memory map.
+    Line endings are kept as they are in the file so spans match the file offsets.
+    '''
+    if isinstance(source, bytes):
+        return source.decode(encoding)
+    if hasattr(source, 'read'):
+        data = source.read()
+        return data.decode(encoding) if isinstance(data, bytes) else data
+
+    with open(source, 'rb') as f:
+        size = os.fstat(f.fileno()).st_size
+        if size == 0 or size < mmap_threshold:
+            return f.read().decode(encoding)
+        mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            with memoryview(mm) as view:
+                return codecs.decode(view, encoding)
+        finally:
+            mm.close()
+
+# Token produced by tokenize_string, line and column are 1-based.
+TokenInfo = collections.namedtuple('TokenInfo', 'type value offset line column')
+
+def iter_tokens(lexer, code, types=None, diagnostics=None):
+    '''
+    Lazily yields TokenInfo for tokens of code lexed by a clone of lexer, only of the given types if set.
+    Lexical errors are recorded to diagnostics if given, otherwise they are ignored.
+    '''
+    types = frozenset(types) if types is not None else None
+    if diagnostics is None:
+        diagnostics = Diagnostics()
+    if diagnostics.lines is None:
+        diagnostics.lines = LineIndex(code)
+    lexer = lexer.clone()
+    lexer.diagnostics = diagnostics
+    lexer.input(code)
+    line = 1
+    line_start = 0
+    last = 0
+    for tok in iter(lexer.token, None):
+        # Newlines are counted only between the previous token and this one, the lexer does not track lines
+        pos = tok.lexpos
+        nl = code.rfind('\n', last, pos)
+        if nl >= 0:
+            line += code.count('\n', last, nl + 1)
+            line_start = nl + 1
+        last = pos
+        if types is None or tok.type in types:
+            yield TokenInfo(tok.type, tok.value, pos, line, pos - line_start + 1)
+
+def clone_parser(parser):
+    '''
+    Creates a new LR parser sharing the LR tables and bound productions of the given one.
+    '''
+    lrtab = yacc.LRTable()
+    lrtab.lr_productions = parser.productions
+    lrtab.lr_action = parser.action
+    lrtab.lr_goto = parser.goto
+    return yacc.LRParser(lrtab, parser.errorfunc)
 
-    def __init__(self):
-        self.lexer = lex.lex(module=ProtobufLexer(), optimize=1)
-        self.parser = yacc.yacc(module=ProtobufParser(), start='goal', optimize=1)
+class ProtobufAnalyzer(object):
 
-    def tokenize_string(self, code):
-        self.lexer.input(code)
-        for token in self.lexer:
-            print(token)
-
-    def tokenize_file(self, _file):
-        if type(_file) == str:
-            _file = file(_file)
-        content = ''
-        for line in _file:
-            content += line
-        return self.tokenize_string(content)
-
-    def parse_string(self, code, debug=0, lineno=1, prefix='+'):
-        self.lexer.lineno = lineno
-        self.parser.offset = len(prefix)
-        return self.parser.parse(prefix + code, lexer=self.lexer, debug=debug)
-
-    def parse_file(self, _file, debug=0):
-        if type(_file) == str:
-            _file = file(_file)
-        content = ''
-        for line in _file:
-            content += line
-        return self.parse_string(content, debug=debug)
+    def __init__(self, lextab=LEXTAB, tabmodule=PARSETAB, lexer=None, parser=None, lean=False):
+        self.lexer = lexer if lexer is not None else build_lexer(lextab)
+        self.parser = parser if parser is not None else build_parser(tabmodule)
+        self.lean = lean
+
+    def clone(self):
+        '''
+        Returns a new analyzer sharing lexer and parser tables with this one.
+        '''
+        return ProtobufAnalyzer(lexer=self.lexer.clone(), parser=clone_parser(self.parser), lean=self.lean)
+
+    def context(self, lineno=1, lean=None, trivia=False, max_diagnostics=MAX_DIAGNOSTICS, index=False):
+        '''
+        Creates a fresh per-parse context, the analyzer itself is never mutated by parsing.
+        '''
+        lean = self.lean if lean is None else lean
+        return ParseContext(self.lexer.clone(), clone_parser(self.parser), lineno=lineno, lean=lean, trivia=trivia,
+                            max_diagnostics=max_diagnostics, index=index)
+
+    def tokenize_string(self, code, types=None, diagnostics=None):
+        '''
+        Returns a generator of TokenInfo tuples, optionally only of the given token types.
+        Lexical errors are recorded to diagnostics (a diagnostics.Diagnostics) if given.
+        '''
+        return iter_tokens(self.lexer, code, types, diagnostics)
+
+    def tokenize_file(self, _file, encoding=DEFAULT_ENCODING, types=None, diagnostics=None):
+        return self.tokenize_string(read_source(_file, encoding), types, diagnostics)
+
+    def tokenize_buffer(self, code, trivia=False, max_diagnostics=MAX_DIAGNOSTICS):
+        '''
+        Lexes code into a TokenBuffer, which can be kept and parsed repeatedly by parse_buffer.
+        Lexical errors are recorded to buf.diagnostics.
+        '''
+        return TokenBuffer.tokenize(self.lexer, code, TOKEN_TYPES, NAME_TYPES, trivia=Trivia() if trivia else None,
+                                    max_diagnostics=max_diagnostics)
+
+    def parse_string(self, code, debug=0, lineno=1, lean=None, trivia=False, max_diagnostics=MAX_DIAGNOSTICS, index=False):
+        '''
+        Parses code, returns ProtoFile or None. With trivia set, comments are recorded to tree.trivia.
+        With index set, nodes are recorded by kind while parsing, tree.nodes_of(cls) then needs no tree walk.
+        Broken statements are skipped, the problems found are in tree.diagnostics.
+        '''
+        return self.check_string(code, debug, lineno, lean, trivia, max_diagnostics, index)[0]
+
+    def check_string(self, code, debug=0, lineno=1, lean=None, trivia=False, max_diagnostics=MAX_DIAGNOSTICS, index=False):
+        '''
+        Parses code, returns (tree, diagnostics). The tree is the partial AST, None if the parser could not recover.
+        '''
+        ctx = self.context(lineno, lean=lean, trivia=trivia, max_diagnostics=max_diagnostics, index=index)
+        tree = ctx.parse(code, debug=debug)
+        return tree, ctx.diagnostics
+
+    def parse_buffer(self, buf, debug=0, lean=None, index=False):
+        return self.context(lean=lean, index=index).parse_buffer(buf, debug=debug)
+
+    def reparse(self, tree, offset, removed, inserted, debug=0, lean=None):
+        '''
+        Updates tree after an edit of its source - removed characters at offset replaced by inserted text.
+        Returns the updated tree, a new one if the file had to be parsed again. See incremental.reparse.
+        '''
+        from .incremental import reparse
+        return reparse(self, tree, offset, removed, inserted, debug=debug, lean=lean)
+
+    def parse_many(self, paths, workers=None, ordered=True, chunk_bytes=None, cache_dir=None):
+        '''
+        Parses files in a process pool, yields batch.ParseResult per file. See batch.parse_many.
+        '''
+        from .batch import parse_many, CHUNK_BYTES
+        return parse_many(paths, workers=workers, ordered=ordered, chunk_bytes=chunk_bytes or CHUNK_BYTES, analyzer=self,
+                          cache_dir=cache_dir)
+
+    def parse_file(self, _file, debug=0, encoding=DEFAULT_ENCODING, lean=None, trivia=False, max_diagnostics=MAX_DIAGNOSTICS,
+                   cache=None, index=False):
+        '''
+        Parses the file. With a cache.ASTCache given the lean tree is taken from the cache if the content
+        did not change, otherwise it is parsed and stored.
+        '''
+        code = read_source(_file, encoding)
+        if cache is not None:
+            return cache.parse_string(self, code, debug=debug, trivia=trivia, max_diagnostics=max_diagnostics, index=index)
+        return self.parse_string(code, debug=debug, lean=lean, trivia=trivia, max_diagnostics=max_diagnostics, index=index)
+
+    def check_file(self, _file, debug=0, encoding=DEFAULT_ENCODING, lean=None, trivia=False, max_diagnostics=MAX_DIAGNOSTICS,
+                   index=False):
+        return self.check_string(read_source(_file, encoding), debug=debug, lean=lean, trivia=trivia,
+                                 max_diagnostics=max_diagnostics, index=index)
+
+_shared_analyzer = None
+_shared_lock = threading.Lock()
+
+def get_analyzer(lean=False):
+    '''
+    Returns a new analyzer cloned from the process-wide one, tables are built only on the first call.
+    '''
+    global _shared_analyzer
+    if _shared_analyzer is None:
+        with _shared_lock:
+            if _shared_analyzer is None:
+                _shared_analyzer = ProtobufAnalyzer()
+    analyzer = _shared_analyzer.clone()
+    analyzer.lean = lean
+    return analyzer
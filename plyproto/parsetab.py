@@ -0,0 +1,124 @@
+
+# parsetab.py
+# This file is automatically generated. Do not edit.
+_tabversion = '3.2'
+
+_lr_method = 'LALR'
+
+_lr_signature = b'&<J\xd8n\xdf\xb2\x90\xcd\xec\x1d2/z\x97M'
+    
+_lr_action_items = {'STARTTOKEN':([0,],[2,]),'$end':([1,2,3,4,5,6,8,9,10,11,12,13,14,15,16,25,33,35,36,41,79,102,104,107,110,114,115,120,121,124,],[0,-1,-95,-1,-87,-88,-94,-89,-91,-81,-82,-83,-84,-85,-86,-90,-73,-92,-93,-74,-65,-54,-48,-50,-71,-80,-66,-55,-49,-72,]),'PACKAGE':([2,],[7,]),'MESSAGE':([2,4,5,6,8,9,10,11,12,13,14,15,16,24,25,33,35,36,37,38,39,41,43,44,45,46,47,48,49,50,51,57,60,63,64,65,79,81,82,83,84,86,87,88,89,90,91,92,93,94,95,96,97,98,99,100,102,104,106,107,108,110,114,115,116,118,120,121,122,124,130,134,142,],[-1,17,-87,-88,17,-89,-91,-81,-82,-83,-84,-85,-86,-30,-90,-73,-92,-93,17,17,67,-74,-31,17,-61,-62,-56,-57,-58,-59,-60,17,67,-42,-40,-41,-65,-63,67,-35,-36,-5,-6,-7,-8,-9,-10,-11,-12,-13,-14,-15,-16,-17,-18,-19,-54,-48,-43,-50,-47,-71,-80,-66,-64,-37,-55,-49,-46,-72,-39,-53,-38,]),'EXTEND':([2,4,5,6,8,9,10,11,12,13,14,15,16,25,33,35,36,37,38,41,44,45,46,47,48,49,50,51,57,79,81,102,104,107,110,114,115,116,120,121,124,134,142,],[-1,18,-87,-88,18,-89,-91,-81,-82,-83,-84,-85,-86,-90,-73,-92,-93,18,18,-74,18,-61,-62,-56,-57,-58,-59,-60,18,-65,-63,-54,-48,-50,-71,-80,-66,-64,-55,-49,-72,-53,-38,]),'ENUM':([2,4,5,6,8,9,10,11,12,13,14,15,16,25,33,35,36,37,38,41,44,45,46,47,48,49,50,51,57,79,81,102,104,107,110,114,115,116,120,121,124,134,142,],[-1,19,-87,-88,19,-89,-91,-81,-82,-83,-84,-85,-86,-90,-73,-92,-93,19,19,-74,19,-61,-62,-56,-57,-58,-59,-60,19,-65,-63,-54,-48,-50,-71,-80,-66,-64,-55,-49,-72,-53,-38,]),'SERVICE':([2,4,5,6,8,9,10,11,12,13,14,15,16,25,33,35,36,41,79,102,104,107,110,114,115,120,121,124,],[-1,20,-87,-88,20,-89,-91,-81,-82,-83,-84,-85,-86,-90,-73,-92,-93,-74,-65,-54,-48,-50,-71,-80,-66,-55,-49,-72,]),'IMPORT':([2,4,5,6,8,9,10,11,12,13,14,15,16,25,33,35,36,41,79,102,104,107,110,114,115,120,121,124,],[-1,21,-87,-88,21,-89,-91,-81,-82,-83,-84,-85,-86,-90,-73,-92,-93,-74,-65,-54,-48,-50,-71,-80,-66,-55,-49,-72,]),'OPTION':([2,4,5,6,8,9,10,11,12,13,14,15,16,25,33,35,36,39,41,60,63,64,65,79,102,104,106,107,108,110,114,115,120,121,122,124,130,],[-1,22,-87,-88,22,-89,-91,-81,-82,-83,-84,-85,-86,-90,-73,-92,-93,22,-74,22,-42,-40,-41,-65,-54,-48,-43,-50,-47,-71,-80,-66,-55,-49,-46,-72,-39,]),'error':([2,4,5,6,8,9,10,11,12,13,14,15,16,25,33,35,36,37,38,39,40,41,44,45,46,47,48,49,50,51,57,60,63,64,65,69,70,71,79,81,102,104,106,107,108,110,112,114,115,116,120,121,122,124,130,134,142,153,],[-1,-1,-87,-88,26,-89,-91,-81,-82,-83,-84,-85,-86,-90,-73,-92,-93,-1,-1,61,-1,-74,80,-61,-62,-56,-57,-58,-59,-60,103,105,-42,-40,-41,111,-68,-69,-65,-63,-54,-48,-43,-50,-47,-71,-70,-80,-66,-64,-55,-49,-46,-72,-39,-53,-38,-67,]),'NAME':([7,17,18,19,20,22,24,34,39,42,43,52,54,55,56,60,63,64,65,72,82,83,84,85,86,87,88,89,90,91,92,93,94,95,96,97,98,99,100,106,108,114,118,122,125,130,140,145,146,],[24,27,28,29,30,32,-30,43,58,73,-31,24,-2,-3,-4,58,-42,-40,-41,113,58,-35,-36,24,-5,-6,-7,-8,-9,-10,-11,-12,-13,-14,-15,-16,-17,-18,-19,-43,-47,-80,-37,-46,131,-39,144,147,148,]),'STRING_LITERAL':([21,42,],[31,78,]),'SEMI':([23,24,26,31,43,61,73,74,75,76,77,78,80,103,105,123,127,128,129,132,133,136,137,138,139,143,154,],[33,-30,35,41,-31,108,-79,114,-75,-76,-77,-78,116,116,122,130,-52,134,-51,-1,-20,142,-26,-27,-28,-29,-25,]),'DOT':([23,24,43,52,54,55,56,84,118,],[34,-30,-31,85,-2,-3,-4,34,34,]),'MAX':([24,39,43,60,63,64,65,82,83,84,86,87,88,89,90,91,92,93,94,95,96,97,98,99,100,106,108,114,118,119,122,130,],[-30,68,-31,68,-42,-40,-41,68,-35,-36,-5,-6,-7,-8,-9,-10,-11,-12,-13,-14,-15,-16,-17,-18,-19,-43,-47,-80,-37,129,-46,-39,]),'RBRACE':([26,37,38,39,40,44,45,46,47,48,49,50,51,57,59,60,61,62,63,64,65,69,70,71,79,80,81,102,103,104,105,106,107,108,111,112,114,115,116,120,121,122,130,134,142,153,],[36,-1,-1,-1,-1,79,-61,-62,-56,-57,-58,-59,-60,102,104,-45,107,-44,-42,-40,-41,110,-68,-69,-65,115,-63,-54,120,-48,121,-43,-50,-47,124,-70,-80,-66,-64,-55,-49,-46,-39,-53,-38,-67,]),'LBRACE':([27,28,29,30,],[37,38,39,40,]),'EQ':([32,58,66,67,68,117,144,],[42,-32,109,-33,-34,126,146,]),'EXTENSIONS':([37,38,44,45,46,47,48,49,50,51,57,79,81,102,104,107,115,116,120,121,134,142,],[53,53,53,-61,-62,-56,-57,-58,-59,-60,53,-65,-63,-54,-48,-50,-66,-64,-55,-49,-53,-38,]),'REQUIRED':([37,38,44,45,46,47,48,49,50,51,57,79,81,102,104,107,115,116,120,121,134,142,],[54,54,54,-61,-62,-56,-57,-58,-59,-60,54,-65,-63,-54,-48,-50,-66,-64,-55,-49,-53,-38,]),'OPTIONAL':([37,38,44,45,46,47,48,49,50,51,57,79,81,102,104,107,115,116,120,121,134,142,],[55,55,55,-61,-62,-56,-57,-58,-59,-60,55,-65,-63,-54,-48,-50,-66,-64,-55,-49,-53,-38,]),'REPEATED':([37,38,44,45,46,47,48,49,50,51,57,79,81,102,104,107,115,116,120,121,134,142,],[56,56,56,-61,-62,-56,-57,-58,-59,-60,56,-65,-63,-54,-48,-50,-66,-64,-55,-49,-53,-38,]),'RPC':([40,69,70,71,112,153,],[72,72,-68,-69,-70,-67,]),'NUM':([42,53,109,119,126,146,],[75,101,123,127,133,150,]),'TRUE':([42,146,],[76,151,]),'FALSE':([42,146,],[77,152,]),'DOUBLE':([52,54,55,56,],[86,-2,-3,-4,]),'FLOAT':([52,54,55,56,],[87,-2,-3,-4,]),'INT32':([52,54,55,56,],[88,-2,-3,-4,]),'INT64':([52,54,55,56,],[89,-2,-3,-4,]),'UINT32':([52,54,55,56,],[90,-2,-3,-4,]),'UINT64':([52,54,55,56,],[91,-2,-3,-4,]),'SINT32':([52,54,55,56,],[92,-2,-3,-4,]),'SINT64':([52,54,55,56,],[93,-2,-3,-4,]),'FIXED32':([52,54,55,56,],[94,-2,-3,-4,]),'FIXED64':([52,54,55,56,],[95,-2,-3,-4,]),'SFIXED32':([52,54,55,56,],[96,-2,-3,-4,]),'SFIXED64':([52,54,55,56,],[97,-2,-3,-4,]),'BOOL':([52,54,55,56,],[98,-2,-3,-4,]),'STRING':([52,54,55,56,],[99,-2,-3,-4,]),'BYTES':([52,54,55,56,],[100,-2,-3,-4,]),'TO':([101,],[119,]),'LPAR':([113,141,],[125,145,]),'RPAR':([131,147,],[135,153,]),'LBRACK':([132,133,137,139,143,154,],[140,-20,140,-28,-29,-25,]),'RETURNS':([135,],[141,]),'RBRACK':([148,149,150,151,152,],[-24,154,-21,-22,-23,]),}
+
+_lr_action = { }
+for _k, _v in _lr_action_items.items():
+   for _x,_y in zip(_v[0],_v[1]):
+      if not _x in _lr_action:  _lr_action[_x] = { }
+      _lr_action[_x][_k] = _y
+del _lr_action_items
+
+_lr_goto_items = {'goal':([0,],[1,]),'protofile':([2,],[3,]),'package_definition':([2,],[4,]),'package_directive':([2,],[5,]),'empty':([2,4,37,38,39,40,132,],[6,10,45,45,62,70,138,]),'statements':([4,],[8,]),'topLevel':([4,8,],[9,25,]),'message_definition':([4,8,37,38,44,57,],[11,11,49,49,49,49,]),'message_extension':([4,8,37,38,44,57,],[12,12,51,51,51,51,]),'enum_definition':([4,8,37,38,44,57,],[13,13,48,48,48,48,]),'service_definition':([4,8,],[14,14,]),'import_directive':([4,8,],[15,15,]),'option_directive':([4,8,39,60,],[16,16,65,65,]),'dotname':([7,52,85,],[23,84,118,]),'message_body':([37,38,],[44,57,]),'message_body_part':([37,38,44,57,],[46,46,81,81,]),'field_definition':([37,38,44,57,],[47,47,47,47,]),'extensions_definition':([37,38,44,57,],[50,50,50,50,]),'field_modifier':([37,38,44,57,],[52,52,52,52,]),'enum_body_opt':([39,],[59,]),'enum_body':([39,],[60,]),'enum_body_part':([39,60,],[63,106,]),'enum_field':([39,60,],[64,64,]),'field_name':([39,60,82,],[66,66,117,]),'method_definition_opt':([40,],[69,]),'method_definition':([40,69,],[71,112,]),'option_rvalue':([42,],[74,]),'field_type':([52,],[82,]),'primitive_type':([52,],[83,]),'extensions_to':([119,],[128,]),'field_id':([126,],[132,]),'field_directive_times':([132,],[136,]),'field_directive_plus':([132,],[137,]),'field_directive':([132,137,],[139,143,]),'rvalue':([146,],[149,]),}
+
+_lr_goto = { }
+for _k, _v in _lr_goto_items.items():
+   for _x,_y in zip(_v[0],_v[1]):
+       if not _x in _lr_goto: _lr_goto[_x] = { }
+       _lr_goto[_x][_k] = _y
+del _lr_goto_items
+_lr_productions = [
+  ("S' -> goal","S'",1,None,None,None),
+  ('empty -> <empty>','empty',0,'p_empty','parser.py',267),
+  ('field_modifier -> REQUIRED','field_modifier',1,'p_field_modifier','parser.py',271),
+  ('field_modifier -> OPTIONAL','field_modifier',1,'p_field_modifier','parser.py',272),
+  ('field_modifier -> REPEATED','field_modifier',1,'p_field_modifier','parser.py',273),
+  ('primitive_type -> DOUBLE','primitive_type',1,'p_primitive_type','parser.py',277),
+  ('primitive_type -> FLOAT','primitive_type',1,'p_primitive_type','parser.py',278),
+  ('primitive_type -> INT32','primitive_type',1,'p_primitive_type','parser.py',279),
+  ('primitive_type -> INT64','primitive_type',1,'p_primitive_type','parser.py',280),
+  ('primitive_type -> UINT32','primitive_type',1,'p_primitive_type','parser.py',281),
+  ('primitive_type -> UINT64','primitive_type',1,'p_primitive_type','parser.py',282),
+  ('primitive_type -> SINT32','primitive_type',1,'p_primitive_type','parser.py',283),
+  ('primitive_type -> SINT64','primitive_type',1,'p_primitive_type','parser.py',284),
+  ('primitive_type -> FIXED32','primitive_type',1,'p_primitive_type','parser.py',285),
+  ('primitive_type -> FIXED64','primitive_type',1,'p_primitive_type','parser.py',286),
+  ('primitive_type -> SFIXED32','primitive_type',1,'p_primitive_type','parser.py',287),
+  ('primitive_type -> SFIXED64','primitive_type',1,'p_primitive_type','parser.py',288),
+  ('primitive_type -> BOOL','primitive_type',1,'p_primitive_type','parser.py',289),
+  ('primitive_type -> STRING','primitive_type',1,'p_primitive_type','parser.py',290),
+  ('primitive_type -> BYTES','primitive_type',1,'p_primitive_type','parser.py',291),
+  ('field_id -> NUM','field_id',1,'p_field_id','parser.py',295),
+  ('rvalue -> NUM','rvalue',1,'p_rvalue','parser.py',299),
+  ('rvalue -> TRUE','rvalue',1,'p_rvalue','parser.py',300),
+  ('rvalue -> FALSE','rvalue',1,'p_rvalue','parser.py',301),
+  ('rvalue -> NAME','rvalue',1,'p_rvalue2','parser.py',305),
+  ('field_directive -> LBRACK NAME EQ rvalue RBRACK','field_directive',5,'p_field_directive','parser.py',311),
+  ('field_directive_times -> field_directive_plus','field_directive_times',1,'p_field_directive_times','parser.py',316),
+  ('field_directive_times -> empty','field_directive_times',1,'p_field_directive_times2','parser.py',320),
+  ('field_directive_plus -> field_directive','field_directive_plus',1,'p_field_directive_plus','parser.py',324),
+  ('field_directive_plus -> field_directive_plus field_directive','field_directive_plus',2,'p_field_directive_plus','parser.py',325),
+  ('dotname -> NAME','dotname',1,'p_dotname','parser.py',333),
+  ('dotname -> dotname DOT NAME','dotname',3,'p_dotname','parser.py',334),
+  ('field_name -> NAME','field_name',1,'p_fieldName','parser.py',343),
+  ('field_name -> MESSAGE','field_name',1,'p_fieldName','parser.py',344),
+  ('field_name -> MAX','field_name',1,'p_fieldName','parser.py',345),
+  ('field_type -> primitive_type','field_type',1,'p_field_type','parser.py',351),
+  ('field_type -> dotname','field_type',1,'p_field_type2','parser.py',356),
+  ('field_type -> DOT dotname','field_type',2,'p_field_type3','parser.py',363),
+  ('field_definition -> field_modifier field_type field_name EQ field_id field_directive_times SEMI','field_definition',7,'p_field_definition','parser.py',369),
+  ('enum_field -> field_name EQ NUM SEMI','enum_field',4,'p_enum_field','parser.py',375),
+  ('enum_body_part -> enum_field','enum_body_part',1,'p_enum_body_part','parser.py',380),
+  ('enum_body_part -> option_directive','enum_body_part',1,'p_enum_body_part','parser.py',381),
+  ('enum_body -> enum_body_part','enum_body',1,'p_enum_body','parser.py',385),
+  ('enum_body -> enum_body enum_body_part','enum_body',2,'p_enum_body','parser.py',386),
+  ('enum_body_opt -> empty','enum_body_opt',1,'p_enum_body_opt','parser.py',394),
+  ('enum_body_opt -> enum_body','enum_body_opt',1,'p_enum_body_opt2','parser.py',398),
+  ('enum_body -> enum_body error SEMI','enum_body',3,'p_enum_body_error','parser.py',404),
+  ('enum_body -> error SEMI','enum_body',2,'p_enum_body_error','parser.py',405),
+  ('enum_definition -> ENUM NAME LBRACE enum_body_opt RBRACE','enum_definition',5,'p_enum_definition','parser.py',412),
+  ('enum_definition -> ENUM NAME LBRACE enum_body error RBRACE','enum_definition',6,'p_enum_definition_error','parser.py',418),
+  ('enum_definition -> ENUM NAME LBRACE error RBRACE','enum_definition',5,'p_enum_definition_error','parser.py',419),
+  ('extensions_to -> MAX','extensions_to',1,'p_extensions_to','parser.py',425),
+  ('extensions_to -> NUM','extensions_to',1,'p_extensions_to2','parser.py',430),
+  ('extensions_definition -> EXTENSIONS NUM TO extensions_to SEMI','extensions_definition',5,'p_extensions_definition','parser.py',435),
+  ('message_extension -> EXTEND NAME LBRACE message_body RBRACE','message_extension',5,'p_message_extension','parser.py',441),
+  ('message_extension -> EXTEND NAME LBRACE message_body error RBRACE','message_extension',6,'p_message_extension_error','parser.py',447),
+  ('message_body_part -> field_definition','message_body_part',1,'p_message_body_part','parser.py',453),
+  ('message_body_part -> enum_definition','message_body_part',1,'p_message_body_part','parser.py',454),
+  ('message_body_part -> message_definition','message_body_part',1,'p_message_body_part','parser.py',455),
+  ('message_body_part -> extensions_definition','message_body_part',1,'p_message_body_part','parser.py',456),
+  ('message_body_part -> message_extension','message_body_part',1,'p_message_body_part','parser.py',457),
+  ('message_body -> empty','message_body',1,'p_message_body','parser.py',462),
+  ('message_body -> message_body_part','message_body',1,'p_message_body2','parser.py',467),
+  ('message_body -> message_body message_body_part','message_body',2,'p_message_body2','parser.py',468),
+  ('message_body -> message_body error SEMI','message_body',3,'p_message_body_error','parser.py',477),
+  ('message_definition -> MESSAGE NAME LBRACE message_body RBRACE','message_definition',5,'p_message_definition','parser.py',484),
+  ('message_definition -> MESSAGE NAME LBRACE message_body error RBRACE','message_definition',6,'p_message_definition_error','parser.py',490),
+  ('method_definition -> RPC NAME LPAR NAME RPAR RETURNS LPAR NAME RPAR','method_definition',9,'p_method_definition','parser.py',497),
+  ('method_definition_opt -> empty','method_definition_opt',1,'p_method_definition_opt','parser.py',502),
+  ('method_definition_opt -> method_definition','method_definition_opt',1,'p_method_definition_opt2','parser.py',506),
+  ('method_definition_opt -> method_definition_opt method_definition','method_definition_opt',2,'p_method_definition_opt2','parser.py',507),
+  ('service_definition -> SERVICE NAME LBRACE method_definition_opt RBRACE','service_definition',5,'p_service_definition','parser.py',517),
+  ('service_definition -> SERVICE NAME LBRACE method_definition_opt error RBRACE','service_definition',6,'p_service_definition_error','parser.py',524),
+  ('package_directive -> PACKAGE dotname SEMI','package_directive',3,'p_package_directive','parser.py',531),
+  ('import_directive -> IMPORT STRING_LITERAL SEMI','import_directive',3,'p_import_directive','parser.py',537),
+  ('option_rvalue -> NUM','option_rvalue',1,'p_option_rvalue','parser.py',542),
+  ('option_rvalue -> TRUE','option_rvalue',1,'p_option_rvalue','parser.py',543),
+  ('option_rvalue -> FALSE','option_rvalue',1,'p_option_rvalue','parser.py',544),
+  ('option_rvalue -> STRING_LITERAL','option_rvalue',1,'p_option_rvalue2','parser.py',548),
+  ('option_rvalue -> NAME','option_rvalue',1,'p_option_rvalue3','parser.py',552),
+  ('option_directive -> OPTION NAME EQ option_rvalue SEMI','option_directive',5,'p_option_directive','parser.py',557),
+  ('topLevel -> message_definition','topLevel',1,'p_topLevel','parser.py',563),
+  ('topLevel -> message_extension','topLevel',1,'p_topLevel','parser.py',564),
+  ('topLevel -> enum_definition','topLevel',1,'p_topLevel','parser.py',565),
+  ('topLevel -> service_definition','topLevel',1,'p_topLevel','parser.py',566),
+  ('topLevel -> import_directive','topLevel',1,'p_topLevel','parser.py',567),
+  ('topLevel -> option_directive','topLevel',1,'p_topLevel','parser.py',568),
+  ('package_definition -> package_directive','package_definition',1,'p_package_definition','parser.py',572),
+  ('package_definition -> empty','package_definition',1,'p_packages2','parser.py',576),
+  ('statements -> topLevel','statements',1,'p_statements2','parser.py',580),
+  ('statements -> statements topLevel','statements',2,'p_statements2','parser.py',581),
+  ('statements -> empty','statements',1,'p_statements','parser.py',589),
+  ('statements -> statements error SEMI','statements',3,'p_statements_error','parser.py',594),
+  ('statements -> statements error RBRACE','statements',3,'p_statements_error','parser.py',595),
+  ('protofile -> package_definition statements','protofile',2,'p_protofile','parser.py',601),
+  ('goal -> STARTTOKEN protofile','goal',2,'p_goal','parser.py',607),
+]
@@ -0,0 +1,128 @@
+__author__ = "Dusan (Ph4r05) Klinec"
+__copyright__ = "Copyright (C) 2014 Dusan (ph4r05) Klinec"
+__license__ = "Apache License, Version 2.0"
+__version__ = "1.0"
+
+from collections import namedtuple
+from .model import LU, DotName, MessageDefinition, EnumDefinition, ServiceDefinition, MessageExtension, \
+    FieldDefinition, MethodDefinition
+
+# Type name used in the file - node is the name node (field type, extended message, rpc input or output type),
+# scope the fully qualified name it is resolved from, fqn the name of the definition it refers to, None if not found.
+Reference = namedtuple('Reference', ['node', 'name', 'scope', 'fqn'])
+
+def _text(name):
+    # Text of a Name node, the package name is a list of LUs.
+    value = name.value
+    if isinstance(value, list):
+        return '.'.join(str(x) for x in value)
+    return str(value)
+
+def _join(scope, name):
+    return scope + '.' + name if scope else name
+
+class SymbolTable(object):
+    '''
+    Symbols of one parsed file keyed by fully qualified name (without the leading dot) - messages, enums and
+    services, in packages. Built in one walk over the file, all type references are then resolved by dict lookups
+    following the protobuf scoping rules:
+    a relative name is looked up from the innermost enclosing message outwards to the package and the root,
+    the first scope defining its first component decides. A name with a leading dot is fully qualified.
+    Only the file itself is known, names defined in imported files are left unresolved.
+    '''
+    def __init__(self, tree):
+        self.package = _text(tree.pkg.name) if tree.pkg else ''
+        self.symbols = {}
+        self.packages = set()
+        self.duplicates = []
+        self._targets = None
+        self._fqns = None
+
+        if self.package:
+            parts = self.package.split('.')
+            for i in range(len(parts)):
+                self.packages.add('.'.join(parts[:i + 1]))
+
+        pending = []
+        stack = [(stmt, self.package) for stmt in reversed(tree.body)]
+        while stack:
+            node, scope = stack.pop()
+            if node.__class__ is LU:
+                node = node.pval
+            cls = node.__class__
+            if cls is MessageDefinition or cls is EnumDefinition or cls is ServiceDefinition:
+                fqn = _join(scope, _text(node.name))
+                if fqn in self.symbols:
+                    self.duplicates.append((fqn, node))
+                else:
+                    self.symbols[fqn] = node
+                if cls is not EnumDefinition:
+                    stack.extend((x, fqn) for x in reversed(node.body))
+            elif cls is FieldDefinition:
+                if isinstance(node.ftype, DotName):
+                    pending.append((node.ftype, node.ftype.value, scope))
+            elif cls is MessageExtension:
+                # Fields of an extension live in the scope the extend block is written in.
+                pending.append((node.name, _text(node.name), scope))
+                stack.extend((x, scope) for x in reversed(node.body))
+            elif cls is MethodDefinition:
+                pending.append((node.name2, _text(node.name2), scope))
+                pending.append((node.name3, _text(node.name3), scope))
+
+        self.references = [Reference(node, name, scope, self.resolve(name, scope)) for node, name, scope in pending]
+
+    def resolve(self, name, scope=''):
+        '''
+        Returns the fully qualified name of the definition the type name refers to from the scope
+        (fully qualified name of the enclosing message, or the package), None if it is not defined in the file.
+        '''
+        symbols = self.symbols
+        if name.startswith('.'):
+            name = name[1:]
+            return name if name in symbols else None
+        first, _, rest = name.partition('.')
+        packages = self.packages
+        while True:
+            candidate = _join(scope, first)
+            if candidate in symbols or candidate in packages:
+                full = _join(candidate, rest) if rest else candidate
+                return full if full in symbols else None
+            if not scope:
+                return None
+            scope = scope.rpartition('.')[0]
+
+    @property
+    def unresolved(self):
+        '''
+        References not defined in the file, e.g., types from imported files.
+        '''
+        return [ref for ref in self.references if ref.fqn is None]
+
+    def fqn(self, node):
+        '''
+        Fully qualified name of a message, enum or service definition of the file.
+        '''
+        if self._fqns is None:
+            self._fqns = dict((id(v), k) for k, v in self.symbols.items())
+        return self._fqns.get(id(node))
+
+    def target(self, node):
+        '''
+        Fully qualified name the name node refers to, e.g., target(field.ftype), None if not resolved.
+        '''
+        if self._targets is None:
+            self._targets = dict((id(ref.node), ref.fqn) for ref in self.references)
+        return self._targets.get(id(node))
+
+    def definition(self, node):
+        '''
+        Definition node (message or enum) the name node refers to, e.g., definition(field.ftype), None if not resolved.
+        '''
+        fqn = self.target(node)
+        return self.symbols[fqn] if fqn is not None else None
+
+    def __getstate__(self):
+        # Lookups keyed by object ids are not valid in another process.
+        state = self.__dict__.copy()
+        state['_targets'] = state['_fqns'] = None
+        return state
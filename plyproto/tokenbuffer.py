@@ -0,0 +1,98 @@
+__author__ = "Dusan (Ph4r05) Klinec"
+__copyright__ = "Copyright (C) 2014 Dusan (ph4r05) Klinec"
+__license__ = "Apache License, Version 2.0"
+__version__ = "1.0"
+
+from sys import intern
+from array import array
+from .lineindex import LineIndex
+from .diagnostics import Diagnostics, MAX_DIAGNOSTICS
+
+class Token(object):
+    '''
+    Light-weight token with the same attributes as ply's LexToken. Lines are not counted while lexing,
+    lineno is always the first line of the input, resolve lines from lexpos by a LineIndex.
+    '''
+    __slots__ = ('type', 'value', 'lineno', 'lexpos', 'lexer')
+
+    def __init__(self, type, value, lineno, lexpos):
+        self.type = type
+        self.value = value
+        self.lineno = lineno
+        self.lexpos = lexpos
+
+    def __str__(self):
+        return "LexToken(%s,%r,%d,%d)" % (self.type, self.value, self.lineno, self.lexpos)
+
+    def __repr__(self):
+        return str(self)
+
+class TokenBuffer(object):
+    '''
+    Token stream of one source stored as parallel arrays - type codes, start and end offsets.
+    Token values are not stored, they are sliced from the source on demand, lines are resolved
+    by the line index of the source. Comments are recorded to trivia if it is set, lexical errors to diagnostics.
+    A buffer is immutable once filled, it can be cached and parsed any number of times.
+    '''
+    __slots__ = ('source', 'type_names', 'type_codes', 'name_codes', 'types', 'starts', 'ends', 'lines', 'trivia', 'diagnostics')
+
+    def __init__(self, source, type_names, name_types=('NAME',)):
+        self.source = source
+        self.type_names = tuple(type_names)
+        self.type_codes = dict((t, i) for i, t in enumerate(self.type_names))
+        # Values of these types are interned when sliced, as the lexer does
+        self.name_codes = frozenset(self.type_codes[t] for t in name_types)
+        self.types = array('B')
+        self.starts = array('I')
+        self.ends = array('I')
+        self.lines = LineIndex(source)
+        self.trivia = None
+        self.diagnostics = Diagnostics(lines=self.lines)
+
+    @classmethod
+    def tokenize(cls, lexer, source, type_names, name_types=('NAME',), trivia=None, max_diagnostics=MAX_DIAGNOSTICS):
+        '''
+        Lexes source with a clone of lexer and fills a new buffer with its tokens.
+        '''
+        buf = cls(source, type_names, name_types)
+        buf.trivia = trivia
+        buf.diagnostics.limit = max_diagnostics
+        lexer = lexer.clone()
+        lexer.trivia = trivia
+        lexer.diagnostics = buf.diagnostics
+        lexer.input(source)
+        codes = buf.type_codes
+        types, starts, ends = buf.types, buf.starts, buf.ends
+        for tok in iter(lexer.token, None):
+            types.append(codes[tok.type])
+            starts.append(tok.lexpos)
+            ends.append(tok.lexpos + len(tok.value))
+        return buf
+
+    def __len__(self):
+        return len(self.types)
+
+    def type(self, i):
+        return self.type_names[self.types[i]]
+
+    def value(self, i):
+        value = self.source[self.starts[i]:self.ends[i]]
+        if self.types[i] in self.name_codes:
+            value = intern(value)
+        return value
+
+    def span(self, i):
+        return (self.starts[i], self.ends[i])
+
+    def __iter__(self):
+        '''
+        Yields the buffered tokens as token objects, e.g., for the parser. Their lineno is the first line
+        of the source, use lines.line(token.lexpos) for the actual line.
+        '''
+        source, name_codes, type_names = self.source, self.name_codes, self.type_names
+        lineno = self.lines.first_line
+        for code, start, end in zip(self.types, self.starts, self.ends):
+            value = source[start:end]
+            if code in name_codes:
+                value = intern(value)
+            yield Token(type_names[code], value, lineno, start)
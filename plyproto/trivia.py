@@ -0,0 +1,84 @@
+__author__ = "Dusan (Ph4r05) Klinec"
+__copyright__ = "Copyright (C) 2014 Dusan (ph4r05) Klinec"
+__license__ = "Apache License, Version 2.0"
+__version__ = "1.0"
+
+import bisect
+from array import array
+
+# Kinds of the recorded trivia.
+LINE_COMMENT, BLOCK_COMMENT = 1, 2
+
+class Trivia(object):
+    '''
+    Comments skipped by the lexer, recorded as (kind, start, end) triples in parallel arrays,
+    ordered by offset. Lexers record into lexer.trivia only if it is set, it is None by default.
+    '''
+    __slots__ = ('kinds', 'starts', 'ends')
+
+    def __init__(self):
+        self.kinds = array('B')
+        self.starts = array('I')
+        self.ends = array('I')
+
+    def add(self, kind, start, end):
+        self.kinds.append(kind)
+        self.starts.append(start)
+        self.ends.append(end)
+
+    def __len__(self):
+        return len(self.kinds)
+
+    def __getitem__(self, i):
+        return self.kinds[i], self.starts[i], self.ends[i]
+
+    def __iter__(self):
+        return zip(self.kinds, self.starts, self.ends)
+
+    def splice(self, start, end, delta, other):
+        '''
+        Replaces entries starting in [start, end) by the entries of other, entries after them are moved by delta.
+        '''
+        lo = bisect.bisect_left(self.starts, start)
+        hi = bisect.bisect_left(self.starts, end)
+        rest = len(self) - hi
+        self.kinds[lo:hi] = other.kinds
+        self.starts[lo:hi] = other.starts
+        self.ends[lo:hi] = other.ends
+        if delta and rest:
+            tail = len(self) - rest
+            self.starts[tail:] = array('I', map(delta.__add__, self.starts[tail:]))
+            self.ends[tail:] = array('I', map(delta.__add__, self.ends[tail:]))
+
+    def leading(self, source, offset):
+        '''
+        Returns indices of the comments directly preceding offset - separated from it and from
+        each other only by whitespace, with at most one line break between them. A comment
+        following code on its line belongs to that code and ends the search.
+        '''
+        idx = bisect.bisect_right(self.ends, offset)
+        res = []
+        pos = offset
+        while idx > 0:
+            start, end = self.starts[idx - 1], self.ends[idx - 1]
+            gap = source[end:pos]
+            if gap.strip() or gap.count('\n') > 1:
+                break
+            if source[source.rfind('\n', 0, start) + 1:start].strip():
+                break
+            idx -= 1
+            res.append(idx)
+            pos = self.starts[idx]
+        res.reverse()
+        return res
+
+    def doc_comment(self, source, node):
+        '''
+        Returns the text of the comments directly preceding the node, None if there are none.
+        '''
+        if node.lexspan is None:
+            return None
+        idx = self.leading(source, node.lexspan[0])
+        if not idx:
+            return None
+        return '\n'.join(source[self.starts[i]:self.ends[i]] for i in idx)
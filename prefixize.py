@@ -1,4 +1,4 @@
-#!/usr/bin/env python2
+#!/usr/bin/env python3
 """
 Adds ObjectiveC prefixes to the Protocol Buffers entities.
 Used with Protoc objective C compiler: https://github.com/alexeyxo/protobuf-objc
@@ -20,6 +20,7 @@ class MyVisitor(m.Visitor):
     doNameSanitization=False
     statementsChanged=0
     prefix=""
+    symbols=None
 
     reserved = ['auto','else','long','switch','break','enum','register','typedef','case','extern','return',
                 'union','char','float','short','unsigned','const','for','signed','void','continue','goto',
@@ -36,6 +37,28 @@ class MyVisitor(m.Visitor):
         '''
         return self.replace(lu, self.prefix + str(oldId))
 
+    def prefixizeType(self, name):
+        '''
+        Prefixizes a type name. Components naming messages or enums of the file are prefixed, package components
+        are kept. A name not defined in the file is prefixed as a whole, after the leading dot if fully qualified.
+        :param name:
+        :return:
+        '''
+        text = str(name.value)
+        absolute = text.startswith('.')
+        parts = text.lstrip('.').split('.')
+        fqn = self.symbols.target(name) if self.symbols is not None else None
+        if fqn is None:
+            newParts = [self.prefix + parts[0]] + parts[1:]
+        else:
+            full = fqn.split('.')
+            base = len(full) - len(parts)
+            newParts = []
+            for i, part in enumerate(parts):
+                isDefinition = '.'.join(full[:base + i + 1]) in self.symbols.symbols
+                newParts.append(self.prefix + part if isDefinition else part)
+        return self.replace(name, ('.' if absolute else '') + '.'.join(newParts))
+
     def replace(self, lu, newCode):
         '''
         Replaces given LU string occurrence with the new one. Modifies local state.
@@ -48,11 +71,10 @@ class MyVisitor(m.Visitor):
         if lu.lexspan == None:
             raise Exception("LU has None lexspan, %s" % lu)
 
-        # Computing code positions/lengths.
-        constCodePart=""
-        oldCodeLen=lu.lexspan[1] - (lu.lexspan[0]-len(constCodePart))
-        codeStart=self.offset+lu.lexspan[0]-1-len(constCodePart)
-        codeEnd=self.offset+lu.lexspan[1]-1
+        # Computing code positions/lengths, lexspan holds offsets into the source.
+        oldCodeLen=lu.lexspan[1] - lu.lexspan[0]
+        codeStart=self.offset+lu.lexspan[0]
+        codeEnd=self.offset+lu.lexspan[1]
 
         # Change the content, replace with the new version.
         newCodeLen = len(newCode)
@@ -83,7 +105,7 @@ class MyVisitor(m.Visitor):
             n = str(obj.value)
             if self.isNameInvalid(n):
                 if self.verbose>1:
-                    print "!!Invalid name: %s, %s" % (n, obj)
+                    print("!!Invalid name: %s, %s" % (n, obj))
                 self.replace(obj.value, 'x'+n)
 
         elif isinstance(obj, m.LU):
@@ -130,10 +152,10 @@ class MyVisitor(m.Visitor):
     def visit_FieldDefinition(self, obj):
         '''New field defined in a message, check type, if is name, prefixize.'''
         if self.verbose > 4:
-            print "\tField: name=%s, lex=%s parent=%s" % (obj.name, obj.lexspan, obj.parent!=None)
+            print("\tField: name=%s, lex=%s parent=%s" % (obj.name, obj.lexspan, obj.parent!=None))
 
         if isinstance(obj.ftype, m.Name):
-            self.prefixize(obj.ftype, obj.ftype.value)
+            self.prefixizeType(obj.ftype)
             self.sanitizeName(obj.ftype)
 
         self.sanitizeName(obj.name)
@@ -141,7 +163,7 @@ class MyVisitor(m.Visitor):
 
     def visit_EnumFieldDefinition(self, obj):
         if self.verbose > 4:
-            print "\tEnumField: name=%s, %s" % (obj.name, obj)
+            print("\tEnumField: name=%s, %s" % (obj.name, obj))
 
         self.sanitizeName(obj.name)
         return True
@@ -149,7 +171,7 @@ class MyVisitor(m.Visitor):
     def visit_EnumDefinition(self, obj):
         '''New enum definition, refactor name'''
         if self.verbose > 3:
-            print "Enum, [%s] body=%s\n\n" % (obj.name, obj.body)
+            print("Enum, [%s] body=%s\n\n" % (obj.name, obj.body))
 
         self.prefixize(obj.name, obj.name.value)
         return True
@@ -157,7 +179,7 @@ class MyVisitor(m.Visitor):
     def visit_MessageDefinition(self, obj):
         '''New message, refactor name, w.r.t. path'''
         if self.verbose > 3:
-            print "Message, [%s] lex=%s body=|%s|\n" % (obj.name, obj.lexspan, obj.body)
+            print("Message, [%s] lex=%s body=|%s|\n" % (obj.name, obj.lexspan, obj.body))
 
         self.prefixize(obj.name, str(obj.name.value))
         self.sanitizeName(obj.name)
@@ -166,7 +188,7 @@ class MyVisitor(m.Visitor):
     def visit_MessageExtension(self, obj):
         '''New message extension, refactor'''
         if self.verbose > 3:
-            print "MessageEXT, [%s] body=%s\n\n" % (obj.name, obj.body)
+            print("MessageEXT, [%s] body=%s\n\n" % (obj.name, obj.body))
 
         self.prefixize(obj.name, obj.name.value)
         self.sanitizeName(obj.name)
@@ -210,7 +232,7 @@ if __name__ == '__main__':
     # Load the file and instantiate the visitor object.
     p = plyproto.parser.ProtobufAnalyzer()
     if args.verbose>0:
-        print " [-] Processing file: %s" % (args.file)
+        print(" [-] Processing file: %s" % (args.file))
     
     # Start the parsing.
     try:
@@ -219,30 +241,30 @@ if __name__ == '__main__':
         v.prefix = args.prefix
         v.verbose = args.verbose
         v.doNameSanitization = args.sanitize > 0
-        with open(args.file, 'r') as content_file:
-            v.content = content_file.read()
-        
-        tree = p.parse_file(args.file)
+        v.content = plyproto.parser.read_source(args.file)
+
+        tree = p.parse_string(v.content)
+        v.symbols = tree.symbols()
         tree.accept(v)
         
         # If here, probably no exception occurred.
         if args.echo:
-            print v.content
+            print(v.content)
         if args.outdir != None and len(args.outdir)>0 and v.statementsChanged>0:
             outfile = args.outdir + '/' + v.prefix + os.path.basename(args.file).capitalize()
-            with open(outfile, 'w') as f:
+            with open(outfile, 'w', encoding=plyproto.parser.DEFAULT_ENCODING, newline='') as f:
                 f.write(v.content)
         if args.inplace and v.statementsChanged>0:
-            with open(args.file, 'w') as f:
+            with open(args.file, 'w', encoding=plyproto.parser.DEFAULT_ENCODING, newline='') as f:
                 f.write(v.content)
                 
         if args.verbose>0:
-            print " [-] Processing finished, changed=%d" % v.statementsChanged
+            print(" [-] Processing finished, changed=%d" % v.statementsChanged)
     except Exception as e:
-        print "    Error occurred! file[%s]" % (args.file), e
+        print("    Error occurred! file[%s]" % (args.file), e)
         if args.verbose>1:
-            print '-'*60
+            print('-'*60)
             traceback.print_exc(file=sys.stdout)
-            print '-'*60
+            print('-'*60)
         sys.exit(1)
         
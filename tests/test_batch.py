@@ -0,0 +1,48 @@
+__author__ = "Dusan (Ph4r05) Klinec"
+__copyright__ = "Copyright (C) 2014 Dusan (ph4r05) Klinec"
+__license__ = "Apache License, Version 2.0"
+__version__ = "1.0"
+
+import os
+import shutil
+import tempfile
+import unittest
+from plyproto.parser import ProtobufAnalyzer
+from plyproto.cache import SUFFIX
+
+class Marking(ProtobufAnalyzer):
+    # Reports every file, shows which analyzer class parsed it.
+    def check_string(self, code, *args, **kwargs):
+        tree, diagnostics = super(Marking, self).check_string(code, *args, **kwargs)
+        diagnostics.add('syntax', 'marked', 0, 0)
+        return tree, diagnostics
+
+class ParseManyTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.paths = []
+        for i in range(4):
+            path = os.path.join(self.directory, 'm%d.proto' % i)
+            with open(path, 'w') as f:
+                f.write('message M%d { optional int32 x = 1; }\n' % i)
+            self.paths.append(path)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_worker_analyzer_class(self):
+        for workers in (1, 2):
+            results = list(Marking().parse_many(self.paths, workers=workers, chunk_bytes=1))
+            self.assertEqual([res.path for res in results], self.paths)
+            self.assertEqual([res.diagnostics for res in results], [['1:1: marked']] * len(self.paths))
+
+    def test_cache_dir(self):
+        cache_dir = os.path.join(self.directory, 'cache')
+        results = list(ProtobufAnalyzer().parse_many(self.paths, workers=2, chunk_bytes=1, cache_dir=cache_dir))
+        self.assertEqual([res.error for res in results], [None] * len(self.paths))
+        self.assertEqual([str(res.tree.body[0].name.value) for res in results], ['M0', 'M1', 'M2', 'M3'])
+        entries = [name for _, _, names in os.walk(cache_dir) for name in names if name.endswith(SUFFIX)]
+        self.assertEqual(len(entries), len(self.paths))
+
+if __name__ == '__main__':
+    unittest.main()
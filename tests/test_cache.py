@@ -0,0 +1,91 @@
+__author__ = "Dusan (Ph4r05) Klinec"
+__copyright__ = "Copyright (C) 2014 Dusan (ph4r05) Klinec"
+__license__ = "Apache License, Version 2.0"
+__version__ = "1.0"
+
+import os
+import shutil
+import tempfile
+import unittest
+import importlib.util
+import plyproto
+from plyproto import parser, cache
+from plyproto.cache import ASTCache
+
+CODE = '''package test;
+message A {
+  optional int32 x = 1;
+}
+'''
+
+def load_module(directory, name, source):
+    path = os.path.join(directory, name + '.py')
+    with open(path, 'w') as f:
+        f.write(source)
+    spec = importlib.util.spec_from_file_location(name, path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+class CacheTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.analyzer = plyproto.get_analyzer()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_module_signature(self):
+        # Same bytecode, different constants and names.
+        a = load_module(self.directory, 'sig_a', 'def a(p):\n    p[0] = Name(LU.i(p, 4))\n')
+        b = load_module(self.directory, 'sig_b', 'def b(p):\n    p[0] = Literal(LU.i(p, 2))\n')
+        self.assertEqual(a.a.__code__.co_code, b.b.__code__.co_code)
+        self.assertNotEqual(parser.module_signature(a), parser.module_signature(b))
+
+    def test_key_invalidation(self):
+        entries = ASTCache(self.directory)
+        key = entries.key(CODE)
+        self.assertEqual(key, entries.key(CODE))
+        self.assertNotEqual(key, entries.key(CODE + ' '))
+        self.assertNotEqual(key, entries.key(CODE, trivia=True))
+        self.assertNotEqual(key, entries.key(CODE, index=True))
+
+        signature = cache.parser_signature
+        cache.parser_signature = lambda: 'changed'
+        try:
+            self.assertNotEqual(key, entries.key(CODE))
+        finally:
+            cache.parser_signature = signature
+
+    def test_hit_restores_source(self):
+        entries = ASTCache(self.directory)
+        first = entries.parse_string(self.analyzer, CODE)
+        tree = entries.parse_string(self.analyzer, CODE)
+        self.assertEqual(entries.stats()['hits'], 1)
+        self.assertEqual(entries.stats()['misses'], 1)
+        self.assertIsNot(tree, first)
+        self.assertEqual(tree.lines.source, CODE)
+        field = tree.body[0].body[0]
+        self.assertEqual(field.linespan, (3, 3))
+        self.assertEqual(CODE[slice(*field.lexspan)], 'optional int32 x = 1;')
+
+    def test_eviction(self):
+        entries = ASTCache(self.directory)
+        keys = []
+        for i in range(4):
+            code = CODE.replace('A', 'A%d' % i)
+            keys.append(entries.key(code))
+            entries.put(keys[-1], self.analyzer.parse_string(code, lean=True))
+            # Distinct modification times, the oldest entry is the least recently used.
+            os.utime(entries.path(keys[-1]), (i, i))
+        size = entries._disk_size()
+
+        entries.max_bytes = size * 3 // 4
+        entries.put(entries.key(CODE), self.analyzer.parse_string(CODE, lean=True))
+        self.assertGreater(entries.evictions, 0)
+        self.assertLessEqual(entries._disk_size(), entries.max_bytes)
+        self.assertIsNone(entries.get(keys[0]))
+        self.assertIsNotNone(entries.get(entries.key(CODE)))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,63 @@
+__author__ = "Dusan (Ph4r05) Klinec"
+__copyright__ = "Copyright (C) 2014 Dusan (ph4r05) Klinec"
+__license__ = "Apache License, Version 2.0"
+__version__ = "1.0"
+
+import unittest
+import plyproto
+from plyproto import astfile
+
+CODE = '''package test;
+message A {
+  optional int32 x = 1;
+  message B { optional A a = 2; }
+}
+enum E { ONE = 1; }
+service S { rpc Get(A) returns (C) }
+message C { optional E e = 1; }
+'''
+
+class ReparseTest(unittest.TestCase):
+    '''
+    A reparsed tree has the same nodes and spans as a full parse of the edited source.
+    '''
+    def setUp(self):
+        self.analyzer = plyproto.get_analyzer()
+
+    def check(self, tree, code):
+        full = self.analyzer.parse_string(code)
+        self.assertEqual(astfile.dumps(tree), astfile.dumps(full))
+        self.assertEqual([n.linespan for n in tree.walk()], [n.linespan for n in full.walk()])
+
+    def test_edits(self):
+        code = CODE
+        tree = self.analyzer.parse_string(code)
+        for text, inserted in (('x = 1', 'y'), ('ONE', '\n\n'), ('e = 1', ' '), ('message B', '// c\n')):
+            offset = code.index(text)
+            code = code[:offset] + inserted + code[offset:]
+            self.assertIs(self.analyzer.reparse(tree, offset, 0, inserted), tree)
+            self.check(tree, code)
+        offset = code.index('enum')
+        code = code[:offset] + code[offset + 3:]
+        tree = self.analyzer.reparse(tree, offset, 3, '')
+        self.check(tree, code)
+
+    def test_following_nodes_not_rewritten(self):
+        tree = self.analyzer.parse_string(CODE)
+        field = tree.body[-1].body[0]
+        stored = field._lexspan
+        offset = CODE.index('x = 1')
+        self.analyzer.reparse(tree, offset, 0, 'abc')
+        self.assertIs(field._lexspan, stored)
+        self.assertEqual(field.lexspan, (stored[0] + 3, stored[1] + 3))
+
+    def test_loaded_tree(self):
+        # Trees from an AST file have no span origins, they are created on the first move.
+        tree = astfile.ASTFile(astfile.dumps(self.analyzer.parse_string(CODE))).root()
+        offset = CODE.index('x = 1')
+        code = CODE[:offset] + 'abc' + CODE[offset:]
+        self.assertIs(self.analyzer.reparse(tree, offset, 0, 'abc'), tree)
+        self.check(tree, code)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,46 @@
+__author__ = "Dusan (Ph4r05) Klinec"
+__copyright__ = "Copyright (C) 2014 Dusan (ph4r05) Klinec"
+__license__ = "Apache License, Version 2.0"
+__version__ = "1.0"
+
+import unittest
+import plyproto
+from plyproto.trivia import Trivia
+from plyproto.diagnostics import Diagnostics
+
+MESSAGE = 'message M { optional int32 x = 1; }'
+
+def lex(code):
+    '''
+    Token stream, trivia and diagnostics of code lexed by a fresh lexer clone.
+    '''
+    lexer = plyproto.get_analyzer().lexer.clone()
+    lexer.lineno = 1
+    lexer.trivia = Trivia()
+    lexer.diagnostics = Diagnostics()
+    lexer.input(code)
+    tokens = [(t.type, t.value, t.lexpos) for t in lexer]
+    return tokens, list(lexer.trivia), list(lexer.diagnostics)
+
+class LexerTest(unittest.TestCase):
+    def test_trailing_ignored(self):
+        tree, diagnostics = plyproto.get_analyzer().check_string(MESSAGE + '\n  \t\f')
+        self.assertEqual(diagnostics, [])
+        self.assertEqual(len(tree.body), 1)
+
+    def test_illegal_character(self):
+        diagnostics = lex(MESSAGE + ' `` \t')[2]
+        self.assertEqual([(d.kind, d.start, d.end) for d in diagnostics], [('lex', 36, 38)])
+
+    def test_token_buffer(self):
+        # A buffer yields the tokens, trivia and diagnostics of the lexer.
+        code = 'a\r\nb /* x\n y */ +5 -3 + - ... "s\\"t" ` // q\n\tmax'
+        analyzer = plyproto.get_analyzer()
+        buf = analyzer.tokenize_buffer(code, trivia=True)
+        tokens, trivia, diagnostics = lex(code)
+        self.assertEqual([(t.type, t.value, t.lexpos) for t in buf], tokens)
+        self.assertEqual(list(buf.trivia), trivia)
+        self.assertEqual(list(buf.diagnostics), diagnostics)
+
+if __name__ == '__main__':
+    unittest.main()
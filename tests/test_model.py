@@ -0,0 +1,96 @@
+__author__ = "Dusan (Ph4r05) Klinec"
+__copyright__ = "Copyright (C) 2014 Dusan (ph4r05) Klinec"
+__license__ = "Apache License, Version 2.0"
+__version__ = "1.0"
+
+import unittest
+import plyproto
+from plyproto import model, astfile
+
+DEPTH = 3000
+
+def nested(depth):
+    return 'message M {' * depth + 'optional int32 x = 1;' + '}' * depth
+
+class Count(model.Visitor):
+    def __init__(self):
+        super(Count, self).__init__()
+        self.messages = 0
+        self.fields = 0
+
+    def visit_MessageDefinition(self, obj):
+        self.messages += 1
+        return True
+
+    def visit_FieldDefinition(self, obj):
+        self.fields += 1
+        return True
+
+class Outermost(Count):
+    def visit_MessageDefinition(self, obj):
+        # No True returned, the children are not visited.
+        self.messages += 1
+
+class CatchAll(model.Visitor):
+    # Handles every node type through __getattr__.
+    def __init__(self):
+        super(CatchAll, self).__init__()
+        self.calls = []
+
+    def __getattr__(self, name):
+        def f(node):
+            self.calls.append(name)
+            return True
+        return f
+
+class DeepTreeTest(unittest.TestCase):
+    '''
+    Trees nested deeper than the recursion limit are visited.
+    '''
+    def setUp(self):
+        self.tree = plyproto.get_analyzer(lean=True).parse_string(nested(DEPTH))
+
+    def test_accept(self):
+        counter = Count()
+        self.tree.accept(counter)
+        self.assertEqual((counter.messages, counter.fields), (DEPTH, 1))
+
+    def test_accept_prune(self):
+        counter = Outermost()
+        self.tree.accept(counter)
+        self.assertEqual((counter.messages, counter.fields), (1, 0))
+
+    def test_ast_file(self):
+        data = astfile.dumps(self.tree)
+        tree = astfile.ASTFile(data).root()
+        self.assertEqual(astfile.dumps(tree), data)
+        self.assertEqual(len(list(tree.walk())), len(list(self.tree.walk())))
+
+class DispatchTest(unittest.TestCase):
+    '''
+    Handlers not defined on the visitor class are still called.
+    '''
+    def setUp(self):
+        self.tree = plyproto.get_analyzer().parse_string('message A { optional int32 x = 1; }')
+
+    def test_getattr(self):
+        visitor = CatchAll()
+        self.tree.accept(visitor)
+        self.assertEqual(visitor.calls, ['visit_Proto', 'visit_MessageDefinition', 'visit_Name', 'visit_FieldDefinition',
+                                         'visit_Name', 'visit_FieldType'])
+
+    def test_instance_handler(self):
+        counter = Count()
+        names = []
+        counter.visit_Name = lambda node: names.append(str(node.value)) or True
+        self.tree.accept(counter)
+        self.assertEqual((counter.messages, counter.fields), (1, 1))
+        self.assertEqual(names, ['A', 'x'])
+
+        # The table cached on the class is not affected by the instance handler.
+        other = Count()
+        self.tree.accept(other)
+        self.assertEqual((other.messages, other.fields), (1, 1))
+
+if __name__ == '__main__':
+    unittest.main()
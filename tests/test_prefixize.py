@@ -0,0 +1,47 @@
+__author__ = "Dusan (Ph4r05) Klinec"
+__copyright__ = "Copyright (C) 2014 Dusan (ph4r05) Klinec"
+__license__ = "Apache License, Version 2.0"
+__version__ = "1.0"
+
+import unittest
+import plyproto
+from prefixize import MyVisitor
+
+CODE = '''package tutorial;
+message Person {
+  enum PhoneType { MOBILE = 0; }
+  message PhoneNumber { optional PhoneType type = 2; }
+  optional .tutorial.Person.PhoneNumber x = 5;
+  optional Person.PhoneNumber y = 6;
+  optional tutorial.Person z = 7;
+  optional Other u = 8;
+  optional .other.Thing t = 9;
+}
+'''
+
+EXPECTED = '''package tutorial;
+message XXPerson {
+  enum XXPhoneType { MOBILE = 0; }
+  message XXPhoneNumber { optional XXPhoneType type = 2; }
+  optional .tutorial.XXPerson.XXPhoneNumber x = 5;
+  optional XXPerson.XXPhoneNumber y = 6;
+  optional tutorial.XXPerson z = 7;
+  optional XXOther u = 8;
+  optional .XXother.Thing t = 9;
+}
+'''
+
+class PrefixizeTest(unittest.TestCase):
+    def test_type_names(self):
+        visitor = MyVisitor()
+        visitor.prefix = 'XX'
+        visitor.verbose = 0
+        visitor.content = CODE
+        tree = plyproto.get_analyzer().parse_string(CODE)
+        visitor.symbols = tree.symbols()
+        tree.accept(visitor)
+        self.assertEqual(visitor.content, EXPECTED)
+        self.assertEqual(plyproto.get_analyzer().check_string(visitor.content)[1], [])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,77 @@
+__author__ = "Dusan (Ph4r05) Klinec"
+__copyright__ = "Copyright (C) 2014 Dusan (ph4r05) Klinec"
+__license__ = "Apache License, Version 2.0"
+__version__ = "1.0"
+
+import io
+import unittest
+import contextlib
+import plyproto
+from plyproto.diagnostics import Diagnostics
+
+NEXT = '\nmessage B { optional int32 z = 3; }'
+
+class ErrorRecoveryTest(unittest.TestCase):
+    '''
+    A broken statement is reported and skipped, the statements after it are kept.
+    '''
+    def check(self, code, errors):
+        tree, diagnostics = plyproto.get_analyzer().check_string(code + NEXT)
+        self.assertEqual([d.message for d in diagnostics], errors)
+        self.assertEqual(str(tree.body[-1].name.value), 'B')
+        return tree
+
+    def test_last_message_field(self):
+        tree = self.check('message A { optional int32 x = 1; optional int32 y = 2 }', ["Syntax error at '}'"])
+        self.assertEqual(len(tree.body[0].body), 1)
+
+    def test_nested_message(self):
+        tree = self.check('message A { message C { optional int32 y = 2 } optional int32 z = 3; }', ["Syntax error at '}'"])
+        self.assertEqual(len(tree.body[0].body), 2)
+
+    def test_last_enum_field(self):
+        self.check('enum E { A = 1; B = }', ["Syntax error at '}'"])
+
+    def test_extension(self):
+        self.check('extend A { optional int32 y = 2 }', ["Syntax error at '}'"])
+
+    def test_service(self):
+        tree = self.check('service S { rpc G(A) returns (B) rpc H(A returns (B) }', ["Syntax error at 'returns'"])
+        self.assertEqual(len(tree.body[0].body), 1)
+
+    def test_adjacent_errors(self):
+        self.check('message A { x; y; }', ["Syntax error at 'x'", "Syntax error at 'y'"])
+
+class TokenStreamDiagnosticsTest(unittest.TestCase):
+    '''
+    Token buffers and token streams record lexical errors instead of printing them.
+    '''
+    CODE = 'message A { optional int32 x = 1; ` }' + NEXT + '\nmessage C { optional }'
+
+    def setUp(self):
+        self.analyzer = plyproto.get_analyzer()
+        self.expected = self.analyzer.check_string(self.CODE)[1]
+
+    def test_parse_buffer(self):
+        out = io.StringIO()
+        with contextlib.redirect_stdout(out):
+            buf = self.analyzer.tokenize_buffer(self.CODE)
+            tree = self.analyzer.parse_buffer(buf)
+            again = self.analyzer.parse_buffer(buf)
+        self.assertEqual(out.getvalue(), '')
+        self.assertEqual([d.kind for d in tree.diagnostics], ['lex', 'syntax'])
+        self.assertEqual(tree.diagnostics, self.expected)
+        self.assertEqual(again.diagnostics, self.expected)
+
+    def test_tokenize_string(self):
+        out = io.StringIO()
+        diagnostics = Diagnostics()
+        with contextlib.redirect_stdout(out):
+            list(self.analyzer.tokenize_string(self.CODE, diagnostics=diagnostics))
+            list(self.analyzer.tokenize_string(self.CODE))
+        self.assertEqual(out.getvalue(), '')
+        self.assertEqual(diagnostics, [d for d in self.expected if d.kind == 'lex'])
+        self.assertEqual(diagnostics.formatted(), ["1:35: Illegal character '`' (0x60)"])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,100 @@
+__author__ = "Dusan (Ph4r05) Klinec"
+__copyright__ = "Copyright (C) 2014 Dusan (ph4r05) Klinec"
+__license__ = "Apache License, Version 2.0"
+__version__ = "1.0"
+
+import unittest
+import plyproto
+
+CODE = '''package foo.bar;
+import "other.proto";
+message A {
+  message B {
+    message C { optional int32 x = 1; }
+    optional C c = 1;
+    optional A a = 2;
+  }
+  message A { optional int32 y = 1; }
+  optional B b = 1;
+  optional A inner = 2;
+  optional B.C bc = 3;
+  optional .foo.bar.A outer = 4;
+  optional .foo.bar.A.B.C abs = 5;
+  optional bar.A pkg = 6;
+  optional foo.bar.A.B full = 7;
+  optional Imported imported = 8;
+  optional .other.Thing thing = 9;
+  optional E e = 10;
+}
+enum E { ONE = 1; }
+extend A { optional A.B ext = 100; }
+service S { rpc Get(A) returns (E) rpc Put(E) returns (Imported) }
+'''
+
+class SymbolTableTest(unittest.TestCase):
+    '''
+    Type references are resolved by the protobuf scoping rules.
+    '''
+    def setUp(self):
+        self.tree = plyproto.get_analyzer().parse_string(CODE)
+        self.table = self.tree.symbols()
+        self.fields = dict((str(f.name.value), f) for f in self.table.symbols['foo.bar.A'].body
+                           if hasattr(f, 'ftype'))
+
+    def target(self, field):
+        return self.table.target(self.fields[field].ftype)
+
+    def test_symbols(self):
+        self.assertEqual(sorted(self.table.symbols), ['foo.bar.A', 'foo.bar.A.A', 'foo.bar.A.B', 'foo.bar.A.B.C',
+                                                      'foo.bar.E', 'foo.bar.S'])
+        self.assertEqual(self.table.duplicates, [])
+        self.assertIs(self.tree.symbols(), self.table)
+
+    def test_nested_scopes(self):
+        self.assertEqual(self.target('b'), 'foo.bar.A.B')
+        self.assertEqual(self.target('bc'), 'foo.bar.A.B.C')
+        self.assertEqual(self.target('e'), 'foo.bar.E')
+        nested = self.table.symbols['foo.bar.A.B'].body
+        self.assertEqual(self.table.target(nested[1].ftype), 'foo.bar.A.B.C')
+
+    def test_shadowing(self):
+        # The innermost scope defining A decides, A.A shadows the outer A inside A.
+        self.assertEqual(self.target('inner'), 'foo.bar.A.A')
+        nested = self.table.symbols['foo.bar.A.B'].body
+        self.assertEqual(self.table.target(nested[2].ftype), 'foo.bar.A.A')
+        self.assertEqual(self.table.resolve('A', 'foo.bar'), 'foo.bar.A')
+        self.assertEqual(self.table.resolve('A', 'foo.bar.A.B'), 'foo.bar.A.A')
+
+    def test_package_prefixed(self):
+        self.assertEqual(self.target('pkg'), 'foo.bar.A')
+        self.assertEqual(self.target('full'), 'foo.bar.A.B')
+        # The first component decides, A.bar does not exist so bar.A is not looked up further out.
+        self.assertIsNone(self.table.resolve('bar.X', 'foo.bar.A'))
+
+    def test_leading_dot(self):
+        self.assertEqual(self.target('outer'), 'foo.bar.A')
+        self.assertEqual(self.target('abs'), 'foo.bar.A.B.C')
+        self.assertIsNone(self.table.resolve('.A', 'foo.bar'))
+        self.assertIs(self.table.definition(self.fields['abs'].ftype), self.table.symbols['foo.bar.A.B.C'])
+
+    def test_extend_and_rpc(self):
+        extension = self.tree.body[-2]
+        self.assertEqual(self.table.target(extension.name), 'foo.bar.A')
+        self.assertEqual(self.table.target(extension.body[0].ftype), 'foo.bar.A.B')
+        get, put = self.tree.body[-1].body
+        self.assertEqual(self.table.target(get.name2), 'foo.bar.A')
+        self.assertEqual(self.table.target(get.name3), 'foo.bar.E')
+        self.assertIsNone(self.table.target(put.name3))
+
+    def test_unresolved(self):
+        self.assertIsNone(self.target('imported'))
+        self.assertIsNone(self.target('thing'))
+        self.assertIsNone(self.table.definition(self.fields['thing'].ftype))
+        self.assertEqual(sorted(ref.name for ref in self.table.unresolved), ['.other.Thing', 'Imported', 'Imported'])
+
+    def test_duplicates(self):
+        table = plyproto.get_analyzer().parse_string('message A { } message A { }').symbols()
+        self.assertEqual([fqn for fqn, _ in table.duplicates], ['A'])
+
+if __name__ == '__main__':
+    unittest.main()